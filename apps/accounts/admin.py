@@ -2,19 +2,76 @@
 Admin configuration for accounts app.
 """
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 from django.contrib.auth.admin import UserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from .models import CustomUser
 
 
+class FasterAdminPaginator(Paginator):
+    """Paginator that estimates unfiltered counts from Postgres statistics.
+
+    COUNT(*) on a large table is a sequential scan on every changelist load.
+    For unfiltered lists on Postgres, read pg_class.reltuples instead; small
+    tables, filtered lists and other databases keep the exact count.
+    """
+
+    EXACT_COUNT_THRESHOLD = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql' or queryset.query.where:
+            return super().count
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        estimate = row[0] if row else -1
+        if estimate < self.EXACT_COUNT_THRESHOLD:
+            return super().count
+        return estimate
+
+
+class UserChangeList(ChangeList):
+    """Changelist that only selects the columns list_display renders."""
+
+    def get_queryset(self, request, exclude_parameters=None):
+        return super().get_queryset(request, exclude_parameters).only(
+            'id', 'email', 'username', 'subscription_tier', 'subscription_status',
+            'invoices_created_this_month', 'is_active', 'created_at',
+        )
+
+
 @admin.register(CustomUser)
 class CustomUserAdmin(UserAdmin):
     list_display = [
         'email', 'username', 'subscription_tier', 'subscription_status',
-        'invoices_created_this_month', 'is_active', 'created_at'
+        'invoices_created_this_month', 'active_recurring_count', 'is_active', 'created_at'
     ]
+    list_select_related = ()  # No implicit joins from display methods
     list_filter = ['subscription_tier', 'subscription_status', 'is_active', 'is_staff']
-    search_fields = ['email', 'username', 'stripe_customer_id']
+    # Default search is an email prefix match, which an index can serve (see
+    # migration 0018); other columns are opt-in via a prefix
+    search_fields = ['^email']
+    search_prefix_fields = {
+        'username:': 'username__istartswith',
+        'stripe:': 'stripe_customer_id',
+    }
+    search_help_text = (
+        'Matches emails starting with the search text. Use "username:<name>" '
+        'or "stripe:<customer id>" to search other fields.'
+    )
     ordering = ['-created_at']
+    paginator = FasterAdminPaginator
+    show_full_result_count = False
+    list_per_page = 50
 
     fieldsets = UserAdmin.fieldsets + (
         ('Subscription', {
@@ -26,7 +83,7 @@ class CustomUserAdmin(UserAdmin):
         }),
         ('API', {
             'fields': (
-                'api_key',
+                'api_key_prefix',
                 'api_key_created_at',
             )
         }),
@@ -39,4 +96,32 @@ class CustomUserAdmin(UserAdmin):
         }),
     )
 
-    readonly_fields = ['api_key', 'api_key_created_at', 'created_at', 'updated_at']
+    readonly_fields = ['api_key_prefix', 'api_key_created_at', 'created_at', 'updated_at']
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        # Only the changelist shows (and sorts by) the recurring count; the
+        # change, delete and history views skip its correlated subquery.
+        match = request.resolver_match
+        if match and match.url_name == f'{self.opts.app_label}_{self.opts.model_name}_changelist':
+            queryset = CustomUser.objects.with_recurring_counts(queryset)
+        return queryset
+
+    def get_search_results(self, request, queryset, search_term):
+        for prefix, lookup in self.search_prefix_fields.items():
+            if search_term.startswith(prefix):
+                term = search_term[len(prefix):].strip()
+                if not term:
+                    # A bare "stripe:" would otherwise match every user
+                    # (username) or the blank ids (stripe)
+                    return queryset.none(), False
+                return queryset.filter(**{lookup: term}), False
+        return super().get_search_results(request, queryset, search_term)
+
+    def get_changelist(self, request, **kwargs):
+        # The change form needs every field, so column pruning is list-only
+        return UserChangeList
+
+    @admin.display(description='Recurring', ordering='active_recurring_count')
+    def active_recurring_count(self, obj):
+        return obj.active_recurring_count
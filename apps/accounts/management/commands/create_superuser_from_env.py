@@ -26,22 +26,24 @@ class Command(BaseCommand):
                 print("[SUPERUSER] ERROR: DJANGO_SUPERUSER_EMAIL and DJANGO_SUPERUSER_PASSWORD must be set", flush=True)
                 return
 
-            existing_user = User.objects.filter(email=email).first()
-            if existing_user:
-                # Update password in case it changed
-                existing_user.set_password(password)
-                existing_user.is_staff = True
-                existing_user.is_superuser = True
-                existing_user.save()
-                print(f"[SUPERUSER] User {email} already exists - password updated", flush=True)
-                return
-
-            User.objects.create_superuser(
+            user, created = User.objects.get_or_create(
                 email=email,
-                username=email.split('@')[0],
-                password=password
+                defaults={
+                    'username': email.split('@')[0],
+                    'is_staff': True,
+                    'is_superuser': True,
+                },
             )
-            print(f"[SUPERUSER] Superuser {email} created successfully", flush=True)
+            # Set (or update, in case it changed) the password
+            user.set_password(password)
+            user.is_staff = True
+            user.is_superuser = True
+            user.save(update_fields=['password', 'is_staff', 'is_superuser'])
+
+            if created:
+                print(f"[SUPERUSER] Superuser {email} created successfully", flush=True)
+            else:
+                print(f"[SUPERUSER] User {email} already exists - password updated", flush=True)
 
         except Exception as e:
             print(f"[SUPERUSER] ERROR: {str(e)}", file=sys.stderr, flush=True)
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.8 on 2026-10-15 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_alter_customuser_managers'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='api_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['subscription_tier', 'subscription_status'], name='accounts_cu_subscri_396db5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['usage_reset_date'], name='accounts_cu_usage_r_07b6d6_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='customuser',
+            constraint=models.UniqueConstraint(condition=models.Q(('api_key__isnull', False)), fields=('api_key',), name='uniq_api_key_notnull'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.8 on 2026-10-15 10:05
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def backfill_api_key_hashes(apps, schema_editor):
+    """Hash existing API keys so they keep authenticating."""
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    for user in CustomUser.objects.filter(api_key__isnull=False).only('pk', 'api_key').iterator():
+        CustomUser.objects.filter(pk=user.pk).update(
+            api_key_hash=hashlib.blake2b(user.api_key.encode(), digest_size=16).digest()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_customuser_tier_indexes_api_key_constraint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='api_key_hash',
+            field=models.BinaryField(blank=True, db_index=True, editable=False, max_length=16, null=True),
+        ),
+        migrations.RunPython(backfill_api_key_hashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.8 on 2026-10-15 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_customuser_api_key_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['-created_at'], name='user_created_desc_idx'),
+        ),
+    ]
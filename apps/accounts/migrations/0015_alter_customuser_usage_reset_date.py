@@ -0,0 +1,19 @@
+# Generated by Django 4.2.8 on 2026-10-15 11:20
+
+import apps.accounts.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_customuser_user_created_desc_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='usage_reset_date',
+            field=models.DateField(default=apps.accounts.models._today),
+        ),
+    ]
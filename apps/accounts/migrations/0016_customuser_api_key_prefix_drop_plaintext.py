@@ -0,0 +1,39 @@
+# Generated by Django 4.2.8 on 2026-10-15 14:20
+
+from django.db import migrations, models
+
+
+def backfill_api_key_prefixes(apps, schema_editor):
+    """Keep the display prefix of existing keys before the plaintext column goes."""
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    for user in CustomUser.objects.filter(api_key__isnull=False).only('pk', 'api_key').iterator():
+        CustomUser.objects.filter(pk=user.pk).update(api_key_prefix=user.api_key[:12])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_alter_customuser_usage_reset_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='api_key_prefix',
+            field=models.CharField(blank=True, default='', max_length=12),
+        ),
+        migrations.RunPython(backfill_api_key_prefixes, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='customuser',
+            name='uniq_api_key_notnull',
+        ),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='api_key',
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='api_key_hash',
+            field=models.BinaryField(blank=True, editable=False, max_length=16, null=True, unique=True),
+        ),
+    ]
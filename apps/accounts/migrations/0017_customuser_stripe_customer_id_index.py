@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-15 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_customuser_api_key_prefix_drop_plaintext'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='stripe_customer_id',
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True),
+        ),
+    ]
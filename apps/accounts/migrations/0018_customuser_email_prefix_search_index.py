@@ -0,0 +1,32 @@
+from django.db import migrations
+
+INDEX_NAME = 'accounts_customuser_email_upper_like'
+
+
+def create_index(apps, schema_editor):
+    # The admin's default email search is istartswith, which PostgreSQL runs
+    # as UPPER(email) LIKE 'Q%'. Only an expression index with pattern ops
+    # serves that; other databases keep the plain unique index.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} '
+        'ON accounts_customuser (UPPER(email::text) varchar_pattern_ops)'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0017_customuser_stripe_customer_id_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -1,12 +1,149 @@
 """
 Custom User model for InvoiceKits.
 """
+import hashlib
 import secrets
-from django.contrib.auth.models import AbstractUser
-from django.db import models
+import time
+from functools import cached_property, lru_cache
+
+from django.conf import settings
+from django.contrib.auth.models import AbstractUser, UserManager
+from django.core.cache import cache
+from django.db import connection, models
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
 from django.utils import timezone
 
 
+# Boolean tier features packed into one int per tier (tier config is static)
+FLAG_BATCH_UPLOAD = 1 << 0
+FLAG_API_ACCESS = 1 << 1
+FLAG_WATERMARK = 1 << 2
+FLAG_RECURRING = 1 << 3
+FLAG_TEAM_SEATS = 1 << 4
+
+
+def _build_tier_flags(tiers):
+    return {
+        tier: (
+            (FLAG_BATCH_UPLOAD if cfg.get('batch_upload', False) else 0)
+            | (FLAG_API_ACCESS if cfg.get('api_access', False) else 0)
+            | (FLAG_WATERMARK if cfg.get('watermark', False) else 0)
+            | (FLAG_RECURRING if cfg.get('recurring_invoices', False) else 0)
+            | (FLAG_TEAM_SEATS if cfg.get('team_seats', 0) > 0 else 0)
+        )
+        for tier, cfg in tiers.items()
+    }
+
+
+_TIER_FLAGS = _build_tier_flags(settings.SUBSCRIPTION_TIERS)
+
+
+def tier_has_api_access(tier):
+    """Whether a subscription tier includes API access."""
+    return bool(_TIER_FLAGS.get(tier, 0) & FLAG_API_ACCESS)
+
+
+def _tier_templates(tier_templates):
+    """Templates a tier grants, plus the free templates everyone gets."""
+    if tier_templates == 'all':
+        return _ALL_TEMPLATES
+    free = getattr(settings, 'FREE_TEMPLATES', ['clean_slate'])
+    return tuple(dict.fromkeys([*tier_templates, *free]))
+
+
+_ALL_TEMPLATES = tuple(settings.INVOICE_TEMPLATES.keys())
+_DEFAULT_TEMPLATES = _tier_templates(['clean_slate'])
+_TIER_TEMPLATES = {
+    tier: _tier_templates(cfg.get('templates', ['clean_slate']))
+    for tier, cfg in settings.SUBSCRIPTION_TIERS.items()
+}
+
+
+@lru_cache(maxsize=1)
+def _today_cached(minute_bucket):
+    return timezone.now().date()
+
+
+def _today():
+    """Current UTC date, recomputed at most once a minute.
+
+    UTC midnight always falls on a minute boundary, so a bucket never spans
+    two dates.
+    """
+    return _today_cached(int(time.time() // 60))
+
+
+def hash_api_key(api_key):
+    """Fixed-width digest of an API key, used for indexed lookups."""
+    return hashlib.blake2b(api_key.encode(), digest_size=16).digest()
+
+
+API_KEY_CACHE_TTL = 600  # seconds
+# What the API-key cache holds: enough to accept or reject a key, no counters
+API_KEY_AUTH_FIELDS = ('pk', 'is_active', 'subscription_tier', 'api_key_hash')
+
+# Buffered API usage counters (see CustomUser.increment_api_call_count)
+API_USAGE_FLUSH_EVERY = 20
+API_USAGE_CACHE_TTL = 40 * 24 * 60 * 60  # Outlives the month in the key
+
+
+def api_key_cache_key(key_hash):
+    """Cache key for the user an API key digest authenticates."""
+    return f"apikey:{bytes(key_hash).hex()}"
+
+
+class CustomUserManager(UserManager):
+    """User manager with list-page annotations."""
+
+    def with_recurring_counts(self, queryset=None):
+        """Annotate each user's get_company() id and its active/paused recurring count.
+
+        Lets can_create_recurring_invoice() answer without extra queries when
+        iterating many users (admin changelist, team dashboards). Annotates
+        ``queryset`` when given, otherwise all users.
+        """
+        from apps.companies.models import Company, TeamMember
+        from apps.invoices.models import RecurringInvoice
+
+        # Same precedence as get_company(): owned, then legacy, then membership
+        company_id = Coalesce(
+            Subquery(
+                Company.objects.filter(owner=OuterRef('pk')).order_by('pk').values('pk')[:1]
+            ),
+            Subquery(Company.objects.filter(user=OuterRef('pk')).values('pk')[:1]),
+            Subquery(
+                TeamMember.objects.filter(user=OuterRef('pk')).order_by('pk').values('company_id')[:1]
+            ),
+        )
+        recurring_count = (
+            RecurringInvoice.objects
+            .filter(company_id=OuterRef('recurring_company_id'), status__in=['active', 'paused'])
+            .order_by()
+            .values('company_id')
+            .annotate(count=Count('pk'))
+            .values('count')
+        )
+        if queryset is None:
+            queryset = self.get_queryset()
+        return queryset.annotate(
+            recurring_company_id=company_id,
+        ).annotate(
+            active_recurring_count=Coalesce(Subquery(recurring_count), 0),
+        )
+
+    def with_companies(self):
+        """Preload the relations get_company() walks, for pages iterating users.
+
+        get_company(), is_company_owner() and is_team_admin() then resolve
+        from the prefetch caches: a constant number of queries per page
+        instead of several per user.
+        """
+        return self.get_queryset().select_related('company').prefetch_related(
+            'owned_companies', 'team_memberships__company',
+        )
+
+
 class CustomUser(AbstractUser):
     """Extended user model with subscription and API features."""
 
@@ -18,7 +155,7 @@ class CustomUser(AbstractUser):
     ]
 
     email = models.EmailField(unique=True)
-    stripe_customer_id = models.CharField(max_length=255, blank=True, null=True)
+    stripe_customer_id = models.CharField(max_length=255, blank=True, null=True, db_index=True)
     subscription_tier = models.CharField(
         max_length=20,
         choices=SUBSCRIPTION_TIERS,
@@ -35,13 +172,15 @@ class CustomUser(AbstractUser):
         ],
         default='inactive'
     )
-    api_key = models.CharField(max_length=64, unique=True, blank=True, null=True)
+    # Only a digest of the API key is stored; the prefix identifies it in the UI.
+    api_key_prefix = models.CharField(max_length=12, blank=True, default='')
+    api_key_hash = models.BinaryField(max_length=16, blank=True, null=True, unique=True, editable=False)
     api_key_created_at = models.DateTimeField(blank=True, null=True)
 
     # Usage tracking (for subscribers)
     invoices_created_this_month = models.PositiveIntegerField(default=0)
     api_calls_this_month = models.PositiveIntegerField(default=0)
-    usage_reset_date = models.DateField(default=timezone.now)
+    usage_reset_date = models.DateField(default=_today)
 
     # Credit system (for pay-as-you-go users)
     credits_balance = models.PositiveIntegerField(default=0)  # Purchased credits
@@ -86,22 +225,48 @@ class CustomUser(AbstractUser):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CustomUserManager()
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
 
     class Meta:
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        indexes = [
+            models.Index(fields=['subscription_tier', 'subscription_status']),
+            models.Index(fields=['usage_reset_date']),
+            # Admin changelist orders by -created_at
+            models.Index(fields=['-created_at'], name='user_created_desc_idx'),
+        ]
 
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'subscription_tier', 'subscription_status'} & set(update_fields):
+            self.clear_tier_cache()
+        super().save(*args, **kwargs)
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.clear_tier_cache()
+
     def generate_api_key(self):
-        """Generate a new API key for the user."""
-        self.api_key = f"inv_{secrets.token_urlsafe(32)}"
+        """Generate a new API key for the user.
+
+        The raw key is returned once and never stored.
+        """
+        old_hash = self.api_key_hash
+        api_key = f"inv_{secrets.token_urlsafe(32)}"
+        self.api_key_prefix = api_key[:12]
+        self.api_key_hash = hash_api_key(api_key)
         self.api_key_created_at = timezone.now()
-        self.save(update_fields=['api_key', 'api_key_created_at'])
-        return self.api_key
+        self.save(update_fields=['api_key_prefix', 'api_key_hash', 'api_key_created_at'])
+        if old_hash:
+            cache.delete(api_key_cache_key(old_hash))  # The old key stops working immediately
+        return api_key
 
     # Credit system methods
     def is_active_subscriber(self):
@@ -116,28 +281,63 @@ class CustomUser(AbstractUser):
         return self.free_credits_remaining + self.credits_balance
 
     def deduct_credit(self):
-        """Deduct one credit, prioritizing free credits first."""
-        if self.free_credits_remaining > 0:
-            self.free_credits_remaining -= 1
-            self.save(update_fields=['free_credits_remaining'])
-            return True
-        elif self.credits_balance > 0:
-            self.credits_balance -= 1
-            self.save(update_fields=['credits_balance'])
-            return True
+        """Deduct one credit, prioritizing free credits first.
+
+        Each bucket is decremented with a guarded UPDATE ... RETURNING, so
+        concurrent requests can't spend the same credit twice and the
+        instance picks up the post-deduction balance without a SELECT.
+        """
+        for field in ('free_credits_remaining', 'credits_balance'):
+            remaining = self._decrement_returning(field)
+            if remaining is not None:
+                setattr(self, field, remaining)
+                return True
+            setattr(self, field, 0)
         return False
 
+    def _decrement_returning(self, field):
+        """Decrement a positive counter column; return its new value, or None if it was 0."""
+        table = connection.ops.quote_name(self._meta.db_table)
+        column = connection.ops.quote_name(self._meta.get_field(field).column)
+        pk_column = connection.ops.quote_name(self._meta.pk.column)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} SET {column} = {column} - 1 '
+                f'WHERE {pk_column} = %s AND {column} > 0 RETURNING {column}',
+                [self.pk],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
     def add_credits(self, amount):
         """Add purchased credits to balance."""
+        CustomUser.objects.filter(pk=self.pk).update(
+            credits_balance=F('credits_balance') + amount,
+            total_credits_purchased=F('total_credits_purchased') + amount,
+        )
         self.credits_balance += amount
         self.total_credits_purchased += amount
-        self.save(update_fields=['credits_balance', 'total_credits_purchased'])
 
     def reset_monthly_usage(self):
-        """Reset monthly usage counters."""
+        """Reset monthly usage counters, keeping the finished month's totals in a UsageRecord."""
+        from apps.billing.models import UsageRecord
+
+        api_calls = self.api_calls_this_month
+        if settings.API_USAGE_BUFFERED:
+            # Calls since the last flush are only in that month's cache counter
+            api_calls = max(api_calls, cache.get(self._api_usage_cache_key(self.usage_reset_date), 0))
+        UsageRecord.objects.update_or_create(
+            user=self,
+            month=self.usage_reset_date.replace(day=1),
+            defaults={
+                'invoices_created': self.invoices_created_this_month,
+                'api_calls': api_calls,
+            },
+        )
+
         self.invoices_created_this_month = 0
         self.api_calls_this_month = 0
-        self.usage_reset_date = timezone.now().date()
+        self.usage_reset_date = _today()
         self.save(update_fields=[
             'invoices_created_this_month',
             'api_calls_this_month',
@@ -146,24 +346,67 @@ class CustomUser(AbstractUser):
 
     def check_usage_reset(self):
         """Check if usage should be reset (new month)."""
-        today = timezone.now().date()
+        today = _today()
         if self.usage_reset_date.month != today.month or self.usage_reset_date.year != today.year:
             self.reset_monthly_usage()
 
+    def _increment_usage(self, field):
+        """Increment a monthly usage counter in one UPDATE.
+
+        If the stored usage_reset_date is from an earlier month, both counters
+        are reset in the same statement (the incremented one to 1), so there is
+        no separate reset write and no read beforehand.
+        """
+        today = _today()
+        this_month = Q(usage_reset_date__year=today.year, usage_reset_date__month=today.month)
+        counter = models.PositiveIntegerField()
+
+        updates = {
+            name: Case(
+                When(this_month, then=F(name) + 1 if name == field else F(name)),
+                default=Value(1 if name == field else 0),
+                output_field=counter,
+            )
+            for name in ('invoices_created_this_month', 'api_calls_this_month')
+        }
+        updates['usage_reset_date'] = Case(
+            When(this_month, then=F('usage_reset_date')),
+            default=Value(today),
+            output_field=models.DateField(),
+        )
+        CustomUser.objects.filter(pk=self.pk).update(**updates)
+
+        if self.usage_reset_date.month != today.month or self.usage_reset_date.year != today.year:
+            self.invoices_created_this_month = 0
+            self.api_calls_this_month = 0
+            self.usage_reset_date = today
+        setattr(self, field, getattr(self, field) + 1)
+
     def effective_tier(self):
         """Tier whose limits actually apply. A lapsed paid subscription falls back to free."""
         if self.subscription_tier != 'free' and self.subscription_status != 'active':
             return 'free'
         return self.subscription_tier
 
+    @cached_property
+    def tier_config(self):
+        """SUBSCRIPTION_TIERS entry for the user's subscription tier, resolved once per instance."""
+        return settings.SUBSCRIPTION_TIERS.get(self.subscription_tier, {})
+
+    @cached_property
+    def effective_tier_config(self):
+        """SUBSCRIPTION_TIERS entry for effective_tier(), resolved once per instance."""
+        return settings.SUBSCRIPTION_TIERS.get(self.effective_tier(), {})
+
+    def clear_tier_cache(self):
+        """Drop cached tier configs. Call after changing subscription_tier/status."""
+        self.__dict__.pop('tier_config', None)
+        self.__dict__.pop('effective_tier_config', None)
+
     def can_create_invoice(self):
         """Check if user can create another invoice against their tier's monthly quota."""
-        from django.conf import settings
-
         self.check_usage_reset()
-        tier_config = settings.SUBSCRIPTION_TIERS.get(
-            self.effective_tier(), settings.SUBSCRIPTION_TIERS['free']
-        )
+        tier_config = self.effective_tier_config or settings.SUBSCRIPTION_TIERS['free']
         limit = tier_config.get('invoices_per_month', 0)
 
         if limit == -1:  # Unlimited
@@ -172,57 +415,80 @@ class CustomUser(AbstractUser):
 
     def increment_invoice_count(self):
         """Increment the monthly invoice count."""
-        self.check_usage_reset()
-        self.invoices_created_this_month += 1
-        self.save(update_fields=['invoices_created_this_month'])
+        self._increment_usage('invoices_created_this_month')
 
     def can_make_api_call(self):
         """Check if user can make another API call this month."""
-        from django.conf import settings
         self.check_usage_reset()
 
-        tier_config = settings.SUBSCRIPTION_TIERS.get(self.subscription_tier, {})
+        tier_config = self.tier_config
         if not tier_config.get('api_access', False):
             return False
 
         limit = tier_config.get('api_calls_per_month', 0)
         if limit == -1:  # Unlimited
             return True
+        self.api_calls_this_month = self.get_api_calls_this_month()
         return self.api_calls_this_month < limit
 
+    def get_api_calls_this_month(self):
+        """API calls this month, including any not yet flushed from the shared counter."""
+        if settings.API_USAGE_BUFFERED:
+            return cache.get(self._api_usage_cache_key(), self.api_calls_this_month)
+        return self.api_calls_this_month
+
     def increment_api_call_count(self):
-        """Increment the API call count for the month."""
+        """Increment the API call count for the month.
+
+        With a shared cache (API_USAGE_BUFFERED) the count lives in a cache
+        counter seeded from the database, and is written back every
+        API_USAGE_FLUSH_EVERY calls, and on every call once the count is
+        within API_USAGE_FLUSH_EVERY of the monthly limit, so losing the
+        counter near the limit loses nothing. Otherwise every call is one
+        UPDATE.
+        """
+        if not settings.API_USAGE_BUFFERED:
+            self._increment_usage('api_calls_this_month')
+            return
+
         self.check_usage_reset()
-        self.api_calls_this_month += 1
-        self.save(update_fields=['api_calls_this_month'])
+        key = self._api_usage_cache_key()
+        cache.add(key, self.api_calls_this_month, API_USAGE_CACHE_TTL)
+        try:
+            count = cache.incr(key)
+        except ValueError:  # Evicted between add() and incr()
+            self._increment_usage('api_calls_this_month')
+            return
+
+        self.api_calls_this_month = count
+        limit = self.tier_config.get('api_calls_per_month', 0)
+        near_limit = limit != -1 and count >= limit - API_USAGE_FLUSH_EVERY
+        if near_limit or count % API_USAGE_FLUSH_EVERY == 0:
+            # Absolute, monotonic write: a late or repeated flush can't lower the count
+            CustomUser.objects.filter(pk=self.pk).update(
+                api_calls_this_month=Greatest(F('api_calls_this_month'), Value(count)),
+            )
+
+    def _api_usage_cache_key(self, day=None):
+        return f"apiusage:{self.pk}:{day or _today():%Y%m}"
 
     def get_available_templates(self):
-        """Get list of templates available to this user.
+        """Get templates available to this user, as a new list.
 
         Includes:
         - Templates from subscription tier
         - Free templates available to everyone
         - Individually purchased premium templates
         """
-        from django.conf import settings
-
-        tier_config = settings.SUBSCRIPTION_TIERS.get(self.subscription_tier, {})
-        tier_templates = tier_config.get('templates', ['clean_slate'])
-
-        # If tier gives all templates, return all
-        if tier_templates == 'all':
-            return list(settings.INVOICE_TEMPLATES.keys())
-
-        # Build set of available templates
-        available = set(tier_templates)
+        available = _TIER_TEMPLATES.get(self.subscription_tier, _DEFAULT_TEMPLATES)
 
-        # Add free templates that everyone gets
-        available.update(getattr(settings, 'FREE_TEMPLATES', ['clean_slate']))
-
-        # Add unlocked premium templates
-        if self.unlocked_templates:
-            available.update(self.unlocked_templates)
+        # Add unlocked premium templates (tiers with 'all' already cover them)
+        if self.unlocked_templates and available is not _ALL_TEMPLATES:
+            extra = [slug for slug in self.unlocked_templates if slug not in available]
+            if extra:
+                available = available + tuple(dict.fromkeys(extra))
 
+        # The per-tier tuples are shared; callers get their own copy
         return list(available)
 
     def unlock_template(self, template_slug):
@@ -235,7 +501,6 @@ class CustomUser(AbstractUser):
 
     def unlock_all_premium_templates(self):
         """Unlock all premium templates (bundle purchase)."""
-        from django.conf import settings
         premium_slugs = list(getattr(settings, 'PREMIUM_TEMPLATES', {}).keys())
         if not self.unlocked_templates:
             self.unlocked_templates = []
@@ -252,15 +517,11 @@ class CustomUser(AbstractUser):
 
     def has_batch_upload(self):
         """Check if user has batch upload feature."""
-        from django.conf import settings
-        tier_config = settings.SUBSCRIPTION_TIERS.get(self.subscription_tier, {})
-        return tier_config.get('batch_upload', False)
+        return bool(_TIER_FLAGS.get(self.subscription_tier, 0) & FLAG_BATCH_UPLOAD)
 
     def has_api_access(self):
         """Check if user has API access."""
-        from django.conf import settings
-        tier_config = settings.SUBSCRIPTION_TIERS.get(self.subscription_tier, {})
-        return tier_config.get('api_access', False)
+        return tier_has_api_access(self.subscription_tier)
 
     def shows_watermark(self):
         """Check if invoices should show watermark.
@@ -269,17 +530,12 @@ class CustomUser(AbstractUser):
         authenticated tier carries a watermark — it applies only to the
         anonymous /try/ flow, which sets it explicitly.
         """
-        from django.conf import settings
-        tier_config = settings.SUBSCRIPTION_TIERS.get(self.effective_tier(), {})
-        return tier_config.get('watermark', False)
+        return bool(_TIER_FLAGS.get(self.effective_tier(), 0) & FLAG_WATERMARK)
 
     def get_usage_percentage(self):
         """Get percentage of monthly invoice quota used (applies to all tiers, incl. free)."""
-        from django.conf import settings
-
         self.check_usage_reset()
-        tier_config = settings.SUBSCRIPTION_TIERS.get(self.effective_tier(), {})
-        limit = tier_config.get('invoices_per_month', 0)
+        limit = self.effective_tier_config.get('invoices_per_month', 0)
 
         if limit == -1:
             return 0
@@ -289,22 +545,24 @@ class CustomUser(AbstractUser):
 
     def has_recurring_invoices(self):
         """Check if user has recurring invoices feature."""
-        from django.conf import settings
-        tier_config = settings.SUBSCRIPTION_TIERS.get(self.subscription_tier, {})
-        return tier_config.get('recurring_invoices', False)
+        return bool(_TIER_FLAGS.get(self.subscription_tier, 0) & FLAG_RECURRING)
 
     def can_create_recurring_invoice(self):
         """Check if user can create another recurring invoice."""
-        from django.conf import settings
         if not self.has_recurring_invoices():
             return False
 
-        tier_config = settings.SUBSCRIPTION_TIERS.get(self.subscription_tier, {})
-        max_recurring = tier_config.get('max_recurring', 0)
+        max_recurring = self.tier_config.get('max_recurring', 0)
 
         if max_recurring == -1:  # Unlimited
             return True
 
+        # Annotated by CustomUser.objects.with_recurring_counts() on list pages
+        if hasattr(self, 'active_recurring_count'):
+            if self.recurring_company_id is None:
+                return False
+            return self.active_recurring_count < max_recurring
+
         # Get count from user's company recurring invoices
         from apps.invoices.models import RecurringInvoice
         try:
@@ -321,50 +579,84 @@ class CustomUser(AbstractUser):
 
     def get_recurring_invoice_limit(self):
         """Get the max recurring invoices allowed for this user's tier."""
-        from django.conf import settings
-        tier_config = settings.SUBSCRIPTION_TIERS.get(self.subscription_tier, {})
-        return tier_config.get('max_recurring', 0)
+        return self.tier_config.get('max_recurring', 0)
 
     # Team seat methods
     def get_team_seat_limit(self):
         """Get the max team seats allowed for this user's tier."""
-        from django.conf import settings
-        tier_config = settings.SUBSCRIPTION_TIERS.get(self.subscription_tier, {})
-        return tier_config.get('team_seats', 0)
+        return self.tier_config.get('team_seats', 0)
 
     def has_team_seats(self):
         """Check if user's tier includes team seats."""
-        return self.get_team_seat_limit() > 0
+        return bool(_TIER_FLAGS.get(self.subscription_tier, 0) & FLAG_TEAM_SEATS)
 
     def get_company(self):
         """Get the company this user belongs to (owned or member of).
 
-        Returns the company the user owns first, then checks team memberships.
+        Returns the company the user owns first, then the legacy one-to-one
+        company, then team memberships. Resolved in a single query and cached
+        on the instance once found, so repeated gate checks in a request
+        (is_team_admin, is_company_owner, ...) don't query again.
         """
-        # First check if user owns a company
-        owned_company = self.owned_companies.first()
-        if owned_company:
-            return owned_company
-
-        # Check legacy company field
-        if hasattr(self, 'company'):
-            try:
-                return self.company
-            except Exception:
-                pass
-
-        # Check if user is a team member
-        membership = self.team_memberships.select_related('company').first()
-        if membership:
-            return membership.company
-
-        return None
+        cached = self.__dict__.get('_company_cache')
+        if cached is not None:
+            return cached
+
+        prefetched, company = self._get_prefetched_company()
+        if prefetched:
+            return company
+
+        from apps.companies.models import Company
+
+        company = Company.objects.filter(
+            Q(owner=self) | Q(user=self) | Q(team_members__user=self)
+        ).order_by(
+            Case(
+                When(owner=self, then=Value(0)),
+                When(user=self, then=Value(1)),
+                default=Value(2),
+            ),
+            'pk',
+        ).first()
+        if company is not None:
+            self.__dict__['_company_cache'] = company
+        return company
+
+    def _get_prefetched_company(self):
+        """Resolve get_company() from CustomUser.objects.with_companies() caches.
+
+        Returns (True, company) when every relation get_company() consults is
+        already loaded, otherwise (False, None).
+        """
+        prefetched = getattr(self, '_prefetched_objects_cache', {})
+        if (
+            'owned_companies' not in prefetched
+            or 'team_memberships' not in prefetched
+            or 'company' not in self._state.fields_cache
+        ):
+            return False, None
+
+        owned = sorted(prefetched['owned_companies'], key=lambda c: c.pk)
+        if owned:
+            return True, owned[0]
+        if self._state.fields_cache['company'] is not None:
+            return True, self._state.fields_cache['company']
+        memberships = sorted(prefetched['team_memberships'], key=lambda m: m.pk)
+        if memberships:
+            return True, memberships[0].company
+        return True, None
 
     def is_team_admin(self, company=None):
         """Check if user is an admin for the given company (or their own company)."""
         company = company or self.get_company()
         if not company:
             return False
+        prefetched = getattr(self, '_prefetched_objects_cache', {})
+        if 'team_memberships' in prefetched and (company.owner_id or company.user_id) != self.pk:
+            return any(
+                m.company_id == company.pk and m.role == 'admin'
+                for m in prefetched['team_memberships']
+            )
         return company.is_admin(self)
 
     def is_company_owner(self, company=None):
@@ -372,12 +664,13 @@ class CustomUser(AbstractUser):
         company = company or self.get_company()
         if not company:
             return False
-        return company.get_effective_owner() == self
+        # Same as get_effective_owner() == self, without loading the owner row
+        return (company.owner_id or company.user_id) == self.pk
 
     # AI Invoice Generator methods
     def check_ai_usage_reset(self):
         """Check if AI generation usage should be reset (new month)."""
-        today = timezone.now().date()
+        today = _today()
         if self.ai_generations_reset_date is None:
             # First time usage - set reset date
             self.ai_generations_reset_date = today
@@ -396,7 +689,6 @@ class CustomUser(AbstractUser):
         Returns:
             int or None: The limit (None means unlimited)
         """
-        from django.conf import settings
         limits = getattr(settings, 'AI_GENERATION_LIMITS', {})
         return limits.get(self.subscription_tier, 3)  # Default to 3 for unknown tiers
 
@@ -426,15 +718,15 @@ class CustomUser(AbstractUser):
     def increment_ai_generation(self):
         """Increment the AI generation count for this month."""
         self.check_ai_usage_reset()
+        CustomUser.objects.filter(pk=self.pk).update(
+            ai_generations_used=F('ai_generations_used') + 1
+        )
         self.ai_generations_used += 1
-        self.save(update_fields=['ai_generations_used'])
 
     # Time tracking methods
     def has_time_tracking(self):
         """Check if user has time tracking feature (all tiers have it)."""
-        from django.conf import settings
-        tier_config = settings.SUBSCRIPTION_TIERS.get(self.subscription_tier, {})
-        return tier_config.get('time_tracking', True)  # Default True for all tiers
+        return self.tier_config.get('time_tracking', True)  # Default True for all tiers
 
     def get_max_active_timers(self):
         """Get the maximum number of active timers allowed for this tier.
@@ -442,9 +734,7 @@ class CustomUser(AbstractUser):
         Returns:
             int: Max timers allowed (-1 means unlimited)
         """
-        from django.conf import settings
-        tier_config = settings.SUBSCRIPTION_TIERS.get(self.subscription_tier, {})
-        return tier_config.get('max_active_timers', 1)
+        return self.tier_config.get('max_active_timers', 1)
 
     def can_start_timer(self):
         """Check if user can start a new timer based on tier limits."""
@@ -458,12 +748,8 @@ class CustomUser(AbstractUser):
 
     def has_time_reports(self):
         """Check if user has access to time tracking reports (Pro+ only)."""
-        from django.conf import settings
-        tier_config = settings.SUBSCRIPTION_TIERS.get(self.subscription_tier, {})
-        return tier_config.get('time_tracking_reports', False)
+        return self.tier_config.get('time_tracking_reports', False)
 
     def has_team_time_tracking(self):
         """Check if user has access to team time tracking (Business only)."""
-        from django.conf import settings
-        tier_config = settings.SUBSCRIPTION_TIERS.get(self.subscription_tier, {})
-        return tier_config.get('team_time_tracking', False)
+        return self.tier_config.get('team_time_tracking', False)
@@ -1,39 +1,59 @@
 """
 Signal handlers for accounts app.
 """
+import threading
+
 from django.conf import settings
+from django.core.cache import cache
 from django.core.mail import send_mail
+from django.db.models.signals import post_delete, post_save
 from django.template.loader import render_to_string
-from django.utils.html import strip_tags
 from allauth.account.signals import user_signed_up
 
+from .models import api_key_cache_key
+
+
+def _send_mail_quietly(**kwargs):
+    try:
+        send_mail(fail_silently=True, **kwargs)  # Don't break signup if email fails
+    except Exception:
+        # Log error but don't break signup
+        pass
+
 
 def send_welcome_email(request, user, **kwargs):
     """Send welcome email when a new user signs up."""
     subject = 'Welcome to InvoiceKits!'
-
-    # Render HTML email
-    html_message = render_to_string('emails/welcome.html', {
+    context = {
         'user': user,
         'site_url': settings.SITE_URL if hasattr(settings, 'SITE_URL') else 'https://www.invoicekits.com',
-    })
+    }
 
-    # Create plain text version
-    plain_message = strip_tags(html_message)
+    # Plain text has its own template rather than strip_tags() over the HTML
+    html_message = render_to_string('emails/welcome.html', context)
+    plain_message = render_to_string('emails/welcome.txt', context)
 
-    try:
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            html_message=html_message,
-            fail_silently=True,  # Don't break signup if email fails
-        )
-    except Exception:
-        # Log error but don't break signup
-        pass
+    # SMTP round-trip happens off the signup request
+    threading.Thread(
+        target=_send_mail_quietly,
+        kwargs={
+            'subject': subject,
+            'message': plain_message,
+            'from_email': settings.DEFAULT_FROM_EMAIL,
+            'recipient_list': [user.email],
+            'html_message': html_message,
+        },
+        daemon=True,
+    ).start()
+
+
+def invalidate_api_key_cache(sender, instance, **kwargs):
+    """Drop the cached API-key user so tier, status and is_active changes apply on the next call."""
+    if instance.api_key_hash:
+        cache.delete(api_key_cache_key(instance.api_key_hash))
 
 
 # Connect signal
 user_signed_up.connect(send_welcome_email)
+post_save.connect(invalidate_api_key_cache, sender=settings.AUTH_USER_MODEL)
+post_delete.connect(invalidate_api_key_cache, sender=settings.AUTH_USER_MODEL)
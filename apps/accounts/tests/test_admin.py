@@ -0,0 +1,87 @@
+"""
+Tests for the user admin: its querysets and search.
+"""
+from django.contrib import admin
+from django.test import RequestFactory, TestCase
+from django.urls import resolve, reverse
+
+from apps.accounts.admin import CustomUserAdmin
+from apps.accounts.models import CustomUser
+
+
+def make_user(email, username, customer_id=None):
+    return CustomUser.objects.create_user(
+        username=username,
+        email=email,
+        password='testpass123',
+        stripe_customer_id=customer_id,
+    )
+
+
+class UserAdminSearchTests(TestCase):
+
+    def setUp(self):
+        self.alice = make_user('alice@test.com', 'alice', 'cus_alice')
+        self.bob = make_user('bob.alice@test.com', 'bob', 'cus_bob')
+        self.model_admin = CustomUserAdmin(CustomUser, admin.site)
+        self.request = RequestFactory().get('/admin/accounts/customuser/')
+
+    def search(self, term):
+        queryset, may_have_duplicates = self.model_admin.get_search_results(
+            self.request, CustomUser.objects.all(), term
+        )
+        self.assertFalse(may_have_duplicates)
+        return set(queryset)
+
+    def test_default_search_is_an_email_prefix_match(self):
+        self.assertEqual(self.search('alice'), {self.alice})
+        self.assertEqual(self.search('ALICE@'), {self.alice})
+        self.assertEqual(self.search('test.com'), set())
+
+    def test_username_prefix(self):
+        self.assertEqual(self.search('username:Bo'), {self.bob})
+
+    def test_stripe_customer_id_is_exact(self):
+        self.assertEqual(self.search('stripe: cus_bob'), {self.bob})
+        self.assertEqual(self.search('stripe:cus_'), set())
+
+    def test_prefix_without_a_term_matches_nothing(self):
+        self.assertEqual(self.search('stripe:'), set())
+        self.assertEqual(self.search('username:  '), set())
+
+
+class UserAdminQuerysetTests(TestCase):
+
+    def setUp(self):
+        self.admin_user = make_user('admin@test.com', 'admin')
+        self.admin_user.is_staff = self.admin_user.is_superuser = True
+        self.admin_user.save()
+        self.model_admin = CustomUserAdmin(CustomUser, admin.site)
+
+    def queryset_for(self, url):
+        request = RequestFactory().get(url)
+        request.resolver_match = resolve(url)
+        return self.model_admin.get_queryset(request)
+
+    def test_changelist_is_annotated_and_ordered(self):
+        queryset = self.queryset_for(reverse('admin:accounts_customuser_changelist'))
+
+        self.assertIn('active_recurring_count', queryset.query.annotations)
+        self.assertEqual(queryset.query.order_by, ('-created_at',))
+
+    def test_change_view_skips_the_recurring_subquery(self):
+        queryset = self.queryset_for(
+            reverse('admin:accounts_customuser_change', args=[self.admin_user.pk])
+        )
+
+        self.assertNotIn('active_recurring_count', queryset.query.annotations)
+
+    def test_changelist_sorts_by_recurring_count(self):
+        self.client.force_login(self.admin_user)
+        url = reverse('admin:accounts_customuser_changelist')
+        column = CustomUserAdmin.list_display.index('active_recurring_count') + 1
+
+        response = self.client.get(url, {'o': f'-{column}'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'admin@test.com')
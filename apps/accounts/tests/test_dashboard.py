@@ -0,0 +1,111 @@
+"""
+Tests for the dashboard's invoice stats: who sees company revenue, and when
+the cached stats are dropped.
+"""
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.accounts.models import CustomUser
+from apps.accounts.views import dashboard_cache_key
+from apps.companies.models import Company, TeamMember
+from apps.invoices.models import Invoice
+
+
+def make_user(email, tier='business'):
+    return CustomUser.objects.create_user(
+        username=email.split('@')[0],
+        email=email,
+        password='testpass123',
+        subscription_tier=tier,
+        subscription_status='active',
+    )
+
+
+class DashboardRevenueTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner = make_user('owner@test.com')
+        self.company = Company.objects.create(owner=self.owner, name='Team Co')
+        Invoice.objects.create(
+            company=self.company,
+            invoice_number='INV-00001',
+            client_name='Client',
+            invoice_date=timezone.now().date(),
+            due_date=timezone.now().date(),
+            total=Decimal('250.00'),
+        )
+
+    def dashboard_for(self, user):
+        self.client.force_login(user)
+        return self.client.get(reverse('accounts:dashboard')).context
+
+    def add_member(self, email, role):
+        member = make_user(email, tier='free')
+        TeamMember.objects.create(company=self.company, user=member, role=role)
+        return member
+
+    def test_owner_sees_revenue(self):
+        context = self.dashboard_for(self.owner)
+
+        self.assertTrue(context['can_view_revenue'])
+        self.assertEqual(context['revenue_this_month'], Decimal('250.00'))
+        self.assertEqual(context['invoices_this_month'], 1)
+
+    def test_team_admin_sees_revenue(self):
+        context = self.dashboard_for(self.add_member('admin@test.com', 'admin'))
+
+        self.assertTrue(context['can_view_revenue'])
+        self.assertEqual(context['revenue_this_month'], Decimal('250.00'))
+
+    def test_team_member_does_not_see_revenue(self):
+        self.dashboard_for(self.owner)  # Warms the company's cached stats
+        context = self.dashboard_for(self.add_member('member@test.com', 'member'))
+
+        self.assertFalse(context['can_view_revenue'])
+        self.assertIsNone(context['revenue_this_month'])
+        self.assertEqual(context['invoices_this_month'], 1)
+        self.assertNotContains(
+            self.client.get(reverse('accounts:dashboard')), 'Total Revenue'
+        )
+
+
+class DashboardCacheInvalidationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner = make_user('owner@test.com')
+        self.company = Company.objects.create(owner=self.owner, name='Team Co')
+        self.key = dashboard_cache_key(self.company.pk)
+        cache.set(self.key, {'revenue_this_month': 0})
+
+    def make_invoice(self):
+        return Invoice.objects.create(
+            company=self.company,
+            invoice_number='INV-00001',
+            client_name='Client',
+            invoice_date=timezone.now().date(),
+            due_date=timezone.now().date(),
+        )
+
+    def test_invoice_write_drops_stats_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_invoice()
+            # Still cached until the write is visible to other requests
+            self.assertIsNotNone(cache.get(self.key))
+
+        self.assertIsNone(cache.get(self.key))
+
+    def test_save_totals_drops_stats(self):
+        invoice = self.make_invoice()
+        cache.set(self.key, {'revenue_this_month': 0})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invoice.total = Decimal('99.00')
+            invoice.save_totals()
+
+        self.assertIsNone(cache.get(self.key))
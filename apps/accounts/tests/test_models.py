@@ -0,0 +1,201 @@
+"""
+Tests for CustomUser tier gates and usage helpers.
+"""
+from datetime import date
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.accounts.models import API_USAGE_FLUSH_EVERY, CustomUser
+from apps.billing.models import UsageRecord
+from apps.companies.models import Company
+from apps.invoices.models import RecurringInvoice
+
+
+def make_user(email='user@test.com', tier='professional', status='active'):
+    return CustomUser.objects.create_user(
+        username=email.split('@')[0],
+        email=email,
+        password='testpass123',
+        subscription_tier=tier,
+        subscription_status=status,
+    )
+
+
+def make_recurring(company, status='active'):
+    today = timezone.now().date()
+    return RecurringInvoice.objects.create(
+        company=company,
+        name='Retainer',
+        client_name='Client',
+        start_date=today,
+        next_run_date=today,
+        status=status,
+    )
+
+
+class RecurringCountAnnotationTests(TestCase):
+    """with_recurring_counts() must agree with the per-user query path."""
+
+    def setUp(self):
+        self.user = make_user()
+        self.company = Company.objects.create(owner=self.user, name='Owned Co')
+
+    def test_annotation_counts_active_and_paused_only(self):
+        make_recurring(self.company, 'active')
+        make_recurring(self.company, 'paused')
+        make_recurring(self.company, 'cancelled')
+
+        user = CustomUser.objects.with_recurring_counts().get(pk=self.user.pk)
+        self.assertEqual(user.recurring_company_id, self.company.pk)
+        self.assertEqual(user.active_recurring_count, 2)
+
+    def test_annotated_user_skips_count_query(self):
+        for _ in range(10):  # Pro tier limit
+            make_recurring(self.company)
+
+        user = CustomUser.objects.with_recurring_counts().get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertFalse(user.can_create_recurring_invoice())
+        self.assertFalse(self.user.can_create_recurring_invoice())
+
+    def test_user_without_company(self):
+        other = make_user('nocompany@test.com')
+        user = CustomUser.objects.with_recurring_counts().get(pk=other.pk)
+        self.assertIsNone(user.recurring_company_id)
+        self.assertFalse(user.can_create_recurring_invoice())
+
+
+class AtomicCounterTests(TestCase):
+    """Counters are updated in the database, not from the in-memory copy."""
+
+    def setUp(self):
+        self.user = make_user(tier='free', status='inactive')
+
+    def test_deduct_credit_spends_free_credits_first(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(free_credits_remaining=1, credits_balance=1)
+        self.user.refresh_from_db()
+
+        self.assertTrue(self.user.deduct_credit())
+        self.assertTrue(self.user.deduct_credit())
+        self.assertFalse(self.user.deduct_credit())
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.free_credits_remaining, 0)
+        self.assertEqual(self.user.credits_balance, 0)
+
+    def test_increment_does_not_lose_concurrent_update(self):
+        stale = CustomUser.objects.get(pk=self.user.pk)
+        self.user.increment_invoice_count()
+        stale.increment_invoice_count()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.invoices_created_this_month, 2)
+
+    def test_increment_resets_stale_month_in_same_update(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(
+            usage_reset_date=date(2020, 1, 1),
+            invoices_created_this_month=7,
+            api_calls_this_month=4,
+        )
+        self.user.refresh_from_db()
+
+        with self.assertNumQueries(1):
+            self.user.increment_invoice_count()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.invoices_created_this_month, 1)
+        self.assertEqual(self.user.api_calls_this_month, 0)
+        self.assertEqual(self.user.usage_reset_date, timezone.now().date())
+
+
+@override_settings(API_USAGE_BUFFERED=True)
+class BufferedApiUsageTests(TestCase):
+    """With a shared cache, API calls are counted there and flushed to the row."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user(tier='business')
+
+    def stored_count(self):
+        return CustomUser.objects.values_list('api_calls_this_month', flat=True).get(pk=self.user.pk)
+
+    def test_counts_are_flushed_in_batches(self):
+        for _ in range(API_USAGE_FLUSH_EVERY - 1):
+            self.user.increment_api_call_count()
+        self.assertEqual(self.stored_count(), 0)
+        self.assertEqual(self.user.get_api_calls_this_month(), API_USAGE_FLUSH_EVERY - 1)
+
+        self.user.increment_api_call_count()
+        self.assertEqual(self.stored_count(), API_USAGE_FLUSH_EVERY)
+
+    def test_every_call_is_flushed_near_the_limit(self):
+        limit = self.user.tier_config['api_calls_per_month']
+        cache.set(self.user._api_usage_cache_key(), limit - 5)
+
+        self.user.increment_api_call_count()
+
+        self.assertEqual(self.stored_count(), limit - 4)
+
+    def test_month_rollover_records_unflushed_calls(self):
+        last_month = date(2020, 1, 15)
+        CustomUser.objects.filter(pk=self.user.pk).update(
+            usage_reset_date=last_month, api_calls_this_month=20, invoices_created_this_month=3,
+        )
+        self.user.refresh_from_db()
+        cache.set(self.user._api_usage_cache_key(last_month), 37)
+
+        self.assertTrue(self.user.can_make_api_call())
+
+        record = UsageRecord.objects.get(user=self.user, month=date(2020, 1, 1))
+        self.assertEqual(record.api_calls, 37)
+        self.assertEqual(record.invoices_created, 3)
+        self.assertEqual(self.stored_count(), 0)
+
+
+class PrefetchedCompanyTests(TestCase):
+    """with_companies() lets company gates resolve without per-user queries."""
+
+    def setUp(self):
+        from apps.companies.models import TeamMember
+
+        self.owner = make_user('owner@test.com', tier='business')
+        self.member = make_user('member@test.com')
+        self.company = Company.objects.create(owner=self.owner, name='Team Co')
+        TeamMember.objects.create(company=self.company, user=self.member, role='admin')
+
+    def test_gates_resolve_from_prefetch(self):
+        users = list(CustomUser.objects.with_companies().filter(
+            pk__in=[self.owner.pk, self.member.pk]
+        ).order_by('pk'))
+        owner, member = users
+
+        with self.assertNumQueries(0):
+            self.assertEqual(owner.get_company(), self.company)
+            self.assertTrue(owner.is_company_owner())
+            self.assertEqual(member.get_company(), self.company)
+            self.assertTrue(member.is_team_admin())
+            self.assertFalse(member.is_company_owner())
+
+
+class AvailableTemplatesTests(TestCase):
+
+    def test_returns_a_fresh_list(self):
+        user = make_user()
+
+        available = user.get_available_templates()
+        self.assertIsInstance(available, list)
+        self.assertIn('executive', available)
+
+        available.clear()  # A caller's copy is its own
+        self.assertIn('executive', user.get_available_templates())
+
+    def test_unlocked_templates_are_added_once(self):
+        user = make_user(tier='legacy')  # Not configured: free templates only
+        user.unlocked_templates = ['executive', 'executive', 'clean_slate']
+
+        self.assertEqual(
+            user.get_available_templates(),
+            ['clean_slate', 'classic_professional', 'executive'],
+        )
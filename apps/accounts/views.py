@@ -1,15 +1,32 @@
 """
 Views for accounts app - Dashboard and account management.
 """
+from datetime import timedelta
+
 from django.shortcuts import render, redirect
+from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import TemplateView, UpdateView
 from django.contrib import messages
 from django.urls import reverse_lazy
-from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from apps.invoices.models import ActiveTimer, Invoice, TimeEntry
+from apps.invoices.views import TRY_SAVED_INVOICE_SESSION_KEY
+
+
+DASHBOARD_CACHE_TTL = 60  # seconds
+
 
-from .models import CustomUser
+def dashboard_cache_key(company_id):
+    """Cache key for a company's dashboard invoice stats in the current month."""
+    return f"dash:{company_id}:{timezone.now():%Y%m}"
 
 
 class DashboardView(LoginRequiredMixin, TemplateView):
@@ -19,7 +36,6 @@ class DashboardView(LoginRequiredMixin, TemplateView):
     def get(self, request, *args, **kwargs):
         # A /try/ draft redeemed at signup lands the new user on their saved
         # invoice (their aha moment) instead of an empty dashboard. One-shot.
-        from apps.invoices.views import TRY_SAVED_INVOICE_SESSION_KEY
         saved_pk = request.session.pop(TRY_SAVED_INVOICE_SESSION_KEY, None)
         if saved_pk:
             messages.success(
@@ -34,30 +50,34 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         user = self.request.user
 
-        # Get user's invoices
-        from apps.invoices.models import Invoice, ActiveTimer, TimeEntry
-        recent_invoices = Invoice.objects.filter(
-            company__user=user
-        ).order_by('-created_at')[:5]
-
-        # Calculate stats
-        from django.db.models import Sum
-        from django.utils import timezone
-        current_month = timezone.now().month
-        current_year = timezone.now().year
-
-        monthly_invoices = Invoice.objects.filter(
-            company__user=user,
-            created_at__month=current_month,
-            created_at__year=current_year
-        )
+        company = user.get_company()
+
+        # Invoice-derived stats only change on invoice events, so they are
+        # cached per company and month; the Invoice signals drop the entry.
+        if company:
+            key = dashboard_cache_key(company.pk)
+            invoice_stats = cache.get(key)
+            if invoice_stats is None:
+                invoice_stats = self._get_invoice_stats(company)
+                cache.set(key, invoice_stats, DASHBOARD_CACHE_TTL)
+        else:
+            invoice_stats = {
+                'recent_invoices': [],
+                'invoices_this_month': 0,
+                'revenue_this_month': 0,
+            }
+
+        # Revenue is for the company's owner and admins; other team members
+        # see the invoice activity but not the totals.
+        can_view_revenue = company is None or user.is_team_admin(company)
+        if not can_view_revenue:
+            invoice_stats = {**invoice_stats, 'revenue_this_month': None}
 
         # Get AI generation info
         ai_limit = user.get_ai_generation_limit()
         ai_remaining = user.get_ai_generations_remaining()
 
         # Get time tracking data
-        company = user.get_company()
         active_timers = []
         recent_time_entries = []
         unbilled_hours = 0
@@ -75,17 +95,15 @@ class DashboardView(LoginRequiredMixin, TemplateView):
                 status='unbilled',
                 billable=True
             )
-            from decimal import Decimal
             for entry in unbilled_entries:
                 unbilled_hours += entry.duration_hours
                 unbilled_value += entry.billable_amount
 
         context.update({
-            'recent_invoices': recent_invoices,
-            'invoices_this_month': monthly_invoices.count(),
-            'revenue_this_month': monthly_invoices.aggregate(Sum('total'))['total__sum'] or 0,
+            **invoice_stats,
+            'can_view_revenue': can_view_revenue,
             'usage_percentage': user.get_usage_percentage(),
-            'tier_config': settings.SUBSCRIPTION_TIERS.get(user.subscription_tier, {}),
+            'tier_config': user.tier_config,
             # Credit system info
             'is_subscriber': user.is_active_subscriber(),
             'credits': {
@@ -108,6 +126,35 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         })
         return context
 
+    @staticmethod
+    def _get_invoice_stats(company):
+        # Filtering on company_id keeps both queries on the invoice table;
+        # no join through Company.
+        # Only the columns the "Recent Invoices" card renders.
+        recent_invoices = list(Invoice.objects.filter(
+            company_id=company.pk
+        ).only(
+            'id', 'invoice_number', 'client_name', 'currency', 'total', 'status', 'created_at',
+        ).order_by('-created_at')[:5])
+
+        # Calculate stats: count and revenue in one pass. A created_at range
+        # (rather than __year/__month) lets the (company, created_at) index
+        # serve the scan.
+        month_start = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        next_month_start = (month_start + timedelta(days=32)).replace(day=1)
+
+        monthly_stats = Invoice.objects.filter(
+            company_id=company.pk,
+            created_at__gte=month_start,
+            created_at__lt=next_month_start,
+        ).aggregate(count=Count('id'), revenue=Sum('total'))
+
+        return {
+            'recent_invoices': recent_invoices,
+            'invoices_this_month': monthly_stats['count'],
+            'revenue_this_month': monthly_stats['revenue'] or 0,
+        }
+
 
 class AccountSettingsView(LoginRequiredMixin, TemplateView):
     """Account settings page."""
@@ -115,9 +162,9 @@ class AccountSettingsView(LoginRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['tier_config'] = settings.SUBSCRIPTION_TIERS.get(
-            self.request.user.subscription_tier, {}
-        )
+        context['tier_config'] = self.request.user.tier_config
+        # A freshly generated key is handed over once; don't leave it in the session.
+        context['new_api_key'] = self.request.session.pop('new_api_key', None)
         return context
 
 
@@ -150,13 +197,16 @@ def update_profile(request):
 
         new_email = request.POST.get('email', '')
         if new_email and new_email != user.email:
-            # Check if email is already in use
-            if CustomUser.objects.filter(email=new_email).exclude(pk=user.pk).exists():
-                messages.error(request, 'This email is already in use.')
-                return redirect('accounts:settings')
             user.email = new_email
 
-        user.save()
+        # email is unique; let the constraint catch a taken address instead
+        # of a racy pre-check query.
+        try:
+            with transaction.atomic():
+                user.save(update_fields=['first_name', 'last_name', 'email'])
+        except IntegrityError:
+            messages.error(request, 'This email is already in use.')
+            return redirect('accounts:settings')
         messages.success(request, 'Profile updated successfully!')
 
     return redirect('accounts:settings')
@@ -166,8 +216,6 @@ def update_profile(request):
 def change_password(request):
     """Change user password."""
     if request.method == 'POST':
-        from django.contrib.auth import update_session_auth_hash
-
         user = request.user
         current_password = request.POST.get('current_password', '')
         new_password1 = request.POST.get('new_password1', '')
@@ -181,8 +229,10 @@ def change_password(request):
             messages.error(request, 'New passwords do not match.')
             return redirect('accounts:settings')
 
-        if len(new_password1) < 8:
-            messages.error(request, 'Password must be at least 8 characters.')
+        try:
+            validate_password(new_password1, user=user)
+        except ValidationError as e:
+            messages.error(request, ' '.join(e.messages))
             return redirect('accounts:settings')
 
         user.set_password(new_password1)
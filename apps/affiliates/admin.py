@@ -1,25 +1,74 @@
+from decimal import Decimal
+
 from django.contrib import admin
+from django.db import transaction
+from django.db.models import Count, DecimalField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from .models import Affiliate, Referral, Commission, AffiliateApplication
+from .services.stats import schedule_stats_updates
+
+
+def _count_subquery(queryset):
+    return Coalesce(Subquery(
+        queryset.order_by().values('affiliate_id').annotate(n=Count('pk')).values('n')
+    ), 0)
+
+
+def _sum_subquery(queryset):
+    return Coalesce(Subquery(
+        queryset.order_by().values('affiliate_id').annotate(total=Sum('amount')).values('total')
+    ), Decimal('0.00'), output_field=DecimalField(max_digits=10, decimal_places=2))
 
 
 @admin.register(Affiliate)
 class AffiliateAdmin(admin.ModelAdmin):
-    list_display = ['user', 'referral_code', 'status', 'total_referrals', 'total_conversions', 'total_earnings', 'pending_earnings', 'created_at']
+    list_display = ['user', 'referral_code', 'status', 'referral_count', 'conversion_count', 'earnings_total', 'earnings_pending', 'created_at']
+    list_select_related = ['user']
     list_filter = ['status', 'created_at']
     search_fields = ['user__email', 'referral_code']
     readonly_fields = ['referral_code', 'total_referrals', 'total_conversions', 'total_earnings', 'pending_earnings', 'paid_earnings', 'created_at', 'approved_at']
     actions = ['approve_affiliates', 'suspend_affiliates']
 
+    def get_queryset(self, request):
+        # Live figures from correlated subqueries (one per column, so the two
+        # reverse relations don't multiply each other's rows), rather than the
+        # denormalized totals update_stats() maintains for the dashboard.
+        referrals = Referral.objects.filter(affiliate=OuterRef('pk'))
+        commissions = Commission.objects.filter(affiliate=OuterRef('pk'))
+        return super().get_queryset(request).annotate(
+            referral_count=_count_subquery(referrals),
+            conversion_count=_count_subquery(referrals.filter(converted=True)),
+            earnings_total=_sum_subquery(commissions),
+            earnings_pending=_sum_subquery(commissions.filter(status='pending')),
+        )
+
+    @admin.display(description='Referrals', ordering='referral_count')
+    def referral_count(self, obj):
+        return obj.referral_count
+
+    @admin.display(description='Conversions', ordering='conversion_count')
+    def conversion_count(self, obj):
+        return obj.conversion_count
+
+    @admin.display(description='Total earnings', ordering='earnings_total')
+    def earnings_total(self, obj):
+        return obj.earnings_total
+
+    @admin.display(description='Pending earnings', ordering='earnings_pending')
+    def earnings_pending(self, obj):
+        return obj.earnings_pending
+
     def approve_affiliates(self, request, queryset):
-        for affiliate in queryset.filter(status='pending'):
-            affiliate.approve()
-        self.message_user(request, f"Approved {queryset.count()} affiliates.")
+        updated = queryset.filter(status='pending').update(
+            status='approved', approved_at=timezone.now()
+        )
+        self.message_user(request, f"Approved {updated} affiliates.")
     approve_affiliates.short_description = "Approve selected affiliates"
 
     def suspend_affiliates(self, request, queryset):
-        queryset.update(status='suspended')
-        self.message_user(request, f"Suspended {queryset.count()} affiliates.")
+        updated = queryset.update(status='suspended')
+        self.message_user(request, f"Suspended {updated} affiliates.")
     suspend_affiliates.short_description = "Suspend selected affiliates"
 
 
@@ -40,9 +89,11 @@ class CommissionAdmin(admin.ModelAdmin):
     actions = ['mark_as_paid']
 
     def mark_as_paid(self, request, queryset):
-        for commission in queryset.filter(status='pending'):
-            commission.mark_paid()
-        self.message_user(request, f"Marked {queryset.count()} commissions as paid.")
+        pending = queryset.filter(status='pending')
+        affiliate_ids = list(pending.values_list('affiliate_id', flat=True).distinct())
+        updated = pending.update(status='paid', paid_at=timezone.now())
+        schedule_stats_updates(affiliate_ids)
+        self.message_user(request, f"Marked {updated} commissions as paid.")
     mark_as_paid.short_description = "Mark selected commissions as paid"
 
 
@@ -54,14 +105,31 @@ class AffiliateApplicationAdmin(admin.ModelAdmin):
     readonly_fields = ['user', 'created_at', 'reviewed_at']
     actions = ['approve_applications', 'reject_applications']
 
+    @transaction.atomic
     def approve_applications(self, request, queryset):
-        for app in queryset.filter(reviewed=False):
-            app.approve()
-        self.message_user(request, f"Approved {queryset.count()} applications.")
+        unreviewed = queryset.filter(reviewed=False)
+        user_ids = set(unreviewed.values_list('user_id', flat=True))
+        now = timezone.now()
+        updated = unreviewed.update(reviewed=True, approved=True, reviewed_at=now)
+
+        # Approve existing affiliate profiles and create the missing ones.
+        Affiliate.objects.filter(user_id__in=user_ids).update(status='approved', approved_at=now)
+        existing = set(
+            Affiliate.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True)
+        )
+        # One save() each rather than bulk_create: save() retries a colliding
+        # referral code, and an admin selection is only a handful of rows.
+        for user_id in user_ids - existing:
+            Affiliate(user_id=user_id, status='approved', approved_at=now).save()
+        self.message_user(request, f"Approved {updated} applications.")
     approve_applications.short_description = "Approve selected applications"
 
     def reject_applications(self, request, queryset):
-        for app in queryset.filter(reviewed=False):
-            app.reject("Application rejected by admin.")
-        self.message_user(request, f"Rejected {queryset.count()} applications.")
+        updated = queryset.filter(reviewed=False).update(
+            reviewed=True,
+            approved=False,
+            rejection_reason="Application rejected by admin.",
+            reviewed_at=timezone.now(),
+        )
+        self.message_user(request, f"Rejected {updated} applications.")
     reject_applications.short_description = "Reject selected applications"
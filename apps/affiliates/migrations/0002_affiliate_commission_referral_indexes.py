@@ -0,0 +1,25 @@
+# Generated by Django 4.2.8 on 2026-10-15 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('affiliates', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='affiliate',
+            index=models.Index(fields=['status', '-created_at'], name='affiliates__status_3c7bc3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commission',
+            index=models.Index(fields=['affiliate', 'status'], name='affiliates__affilia_c2b19a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='referral',
+            index=models.Index(fields=['affiliate', 'converted'], name='affiliates__affilia_105167_idx'),
+        ),
+    ]
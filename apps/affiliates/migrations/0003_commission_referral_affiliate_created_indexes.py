@@ -0,0 +1,21 @@
+# Generated by Django 4.2.8 on 2026-10-15 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('affiliates', '0002_affiliate_commission_referral_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='commission',
+            index=models.Index(fields=['affiliate', '-created_at'], name='affiliates__affilia_ff7df6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='referral',
+            index=models.Index(fields=['affiliate', '-created_at'], name='affiliates__affilia_b4688b_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-15 19:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('affiliates', '0003_commission_referral_affiliate_created_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='affiliate',
+            name='stats_dirty_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -1,10 +1,16 @@
 import uuid
 import secrets
 from decimal import Decimal
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, Q, Sum
 from django.conf import settings
 from django.utils import timezone
 
+from .services.stats import schedule_stats_update
+
+
+REFERRAL_CODE_ATTEMPTS = 5
+
 
 def generate_referral_code():
     """Generate a unique 8-character referral code."""
@@ -48,6 +54,8 @@ class Affiliate(models.Model):
     total_earnings = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
     pending_earnings = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
     paid_earnings = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    # Set when the stats above are out of date; cleared by the recompute
+    stats_dirty_at = models.DateTimeField(null=True, blank=True, db_index=True)
 
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -55,10 +63,30 @@ class Affiliate(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', '-created_at']),
+        ]
 
     def __str__(self):
         return f"{self.user.email} ({self.referral_code})"
 
+    def save(self, *args, **kwargs):
+        """Save, regenerating the referral code if a new one collides with an existing code."""
+        # Codes are stored uppercase so referral links can match them exactly
+        self.referral_code = self.referral_code.upper()
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+
+        for attempt in range(REFERRAL_CODE_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                collided = Affiliate.objects.filter(referral_code=self.referral_code).exists()
+                if not collided or attempt == REFERRAL_CODE_ATTEMPTS - 1:
+                    raise
+                self.referral_code = generate_referral_code()
+
     def get_referral_url(self):
         """Get the full referral URL."""
         return f"https://www.invoicekits.com/ref/{self.referral_code}/"
@@ -70,14 +98,22 @@ class Affiliate(models.Model):
         self.save(update_fields=['status', 'approved_at'])
 
     def update_stats(self):
-        """Recalculate stats from related objects."""
-        self.total_referrals = self.referrals.count()
-        self.total_conversions = self.referrals.filter(converted=True).count()
-
-        commissions = self.commissions.all()
-        self.total_earnings = sum(c.amount for c in commissions)
-        self.pending_earnings = sum(c.amount for c in commissions.filter(status='pending'))
-        self.paid_earnings = sum(c.amount for c in commissions.filter(status='paid'))
+        """Recalculate stats from related objects (two aggregate queries)."""
+        referral_stats = self.referrals.aggregate(
+            total=Count('id'),
+            converted=Count('id', filter=Q(converted=True)),
+        )
+        commission_stats = self.commissions.aggregate(
+            total=Sum('amount'),
+            pending=Sum('amount', filter=Q(status='pending')),
+            paid=Sum('amount', filter=Q(status='paid')),
+        )
+
+        self.total_referrals = referral_stats['total']
+        self.total_conversions = referral_stats['converted']
+        self.total_earnings = commission_stats['total'] or Decimal('0.00')
+        self.pending_earnings = commission_stats['pending'] or Decimal('0.00')
+        self.paid_earnings = commission_stats['paid'] or Decimal('0.00')
 
         self.save(update_fields=[
             'total_referrals', 'total_conversions',
@@ -118,6 +154,10 @@ class Referral(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['affiliate', 'converted']),
+            models.Index(fields=['affiliate', '-created_at']),
+        ]
 
     def __str__(self):
         if self.referred_user:
@@ -130,7 +170,16 @@ class Referral(models.Model):
             self.converted = True
             self.converted_at = timezone.now()
             self.save(update_fields=['converted', 'converted_at'])
-            self.affiliate.update_stats()
+            schedule_stats_update(self.affiliate)
+
+
+class CommissionManager(models.Manager):
+    def bulk_create(self, objs, *args, **kwargs):
+        """bulk_create() skips save(); fill in unset amounts the same way save() does."""
+        objs = list(objs)
+        for commission in objs:
+            commission.fill_amount()
+        return super().bulk_create(objs, *args, **kwargs)
 
 
 class Commission(models.Model):
@@ -174,24 +223,33 @@ class Commission(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     paid_at = models.DateTimeField(null=True, blank=True)
 
+    objects = CommissionManager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['affiliate', 'status']),
+            models.Index(fields=['affiliate', '-created_at']),
+        ]
 
     def __str__(self):
         return f"${self.amount} commission for {self.affiliate.user.email}"
 
     def save(self, *args, **kwargs):
-        # Calculate commission amount if not set
+        self.fill_amount()
+        super().save(*args, **kwargs)
+
+    def fill_amount(self):
+        """Calculate the commission amount from the purchase if it isn't set."""
         if not self.amount:
             self.amount = self.purchase_amount * self.commission_rate
-        super().save(*args, **kwargs)
 
     def mark_paid(self):
         """Mark this commission as paid."""
         self.status = 'paid'
         self.paid_at = timezone.now()
         self.save(update_fields=['status', 'paid_at'])
-        self.affiliate.update_stats()
+        schedule_stats_update(self.affiliate)
 
 
 class AffiliateApplication(models.Model):
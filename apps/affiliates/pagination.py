@@ -0,0 +1,101 @@
+"""
+Keyset pagination for the affiliate list views.
+
+Referral and commission lists only ever grow, and OFFSET pagination makes
+the database walk (and a COUNT(*) touch) every earlier row on each page
+request. These views instead page on the (created_at, id) ordering: the
+page links carry the last/first row's key, and each page is a single
+indexed range scan of page_size + 1 rows (the extra row tells us whether
+there is another page). There is no total count and no jumping to page N.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.db.models import Q
+
+CURSOR_TIME_FORMAT = '%Y%m%d%H%M%S%f'
+
+
+def encode_cursor(obj):
+    """Cursor string for a row: its UTC created_at and pk."""
+    created_at = obj.created_at.astimezone(dt_timezone.utc)
+    return f"{created_at.strftime(CURSOR_TIME_FORMAT)}.{obj.pk}"
+
+
+def decode_cursor(cursor):
+    """Return (created_at, pk) for a cursor string, or None if it's malformed."""
+    try:
+        stamp, pk = cursor.split('.', 1)
+        created_at = datetime.strptime(stamp, CURSOR_TIME_FORMAT).replace(tzinfo=dt_timezone.utc)
+        return created_at, int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+class KeysetPage:
+    """The slice of Page the affiliate list templates use."""
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        return encode_cursor(self.object_list[-1]) if self._has_next else None
+
+    @property
+    def previous_cursor(self):
+        return encode_cursor(self.object_list[0]) if self._has_previous else None
+
+
+class KeysetPaginationMixin:
+    """
+    Newest-first keyset pagination for a ListView over a model with created_at.
+
+    Pages are addressed with ?after=<cursor> (older rows) or ?before=<cursor>
+    (newer rows) instead of ?page=N.
+    """
+
+    def paginate_queryset(self, queryset, page_size):
+        after = decode_cursor(self.request.GET.get('after'))
+        before = None if after else decode_cursor(self.request.GET.get('before'))
+
+        if before:
+            created_at, pk = before
+            queryset = queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+            ).order_by('created_at', 'pk')
+        else:
+            queryset = queryset.order_by('-created_at', '-pk')
+            if after:
+                created_at, pk = after
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+                )
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        if before:
+            rows.reverse()
+            page = KeysetPage(rows, has_next=True, has_previous=has_more)
+        else:
+            page = KeysetPage(rows, has_next=has_more, has_previous=bool(after))
+
+        return None, page, rows, page.has_other_pages()
@@ -5,8 +5,10 @@ Handles creating commissions when referred users make purchases.
 """
 from decimal import Decimal
 from django.db import transaction
+from django.utils import timezone
 
 from apps.affiliates.models import Referral, Commission
+from apps.affiliates.services.stats import schedule_stats_update
 
 
 COMMISSION_RATE = Decimal('0.20')  # 20% commission
@@ -34,25 +36,29 @@ def create_commission_for_purchase(
     Returns:
         Commission object if created, None if user wasn't referred
     """
-    # Check if user has a referral
-    try:
-        referral = Referral.objects.select_related('affiliate').get(referred_user=user)
-    except Referral.DoesNotExist:
-        return None
-
-    # Check if affiliate is still approved
-    if referral.affiliate.status != 'approved':
-        return None
+    # Lock the referral so concurrent purchases by the same user convert it
+    # once and create their commissions one after another.
+    with transaction.atomic():
+        referral = (
+            Referral.objects.select_related('affiliate')
+            .select_for_update(of=('self',))
+            .filter(referred_user=user)
+            .first()
+        )
+        if referral is None:
+            return None
 
-    # Mark referral as converted if not already
-    if not referral.converted:
-        referral.mark_converted()
+        # Check if affiliate is still approved
+        if referral.affiliate.status != 'approved':
+            return None
 
-    # Calculate commission
-    commission_amount = purchase_amount * COMMISSION_RATE
+        # Mark referral as converted if not already
+        if not referral.converted:
+            referral.converted = True
+            referral.converted_at = timezone.now()
+            referral.save(update_fields=['converted', 'converted_at'])
 
-    # Create commission record
-    with transaction.atomic():
+        # Create commission record
         commission = Commission.objects.create(
             affiliate=referral.affiliate,
             referral=referral,
@@ -60,21 +66,17 @@ def create_commission_for_purchase(
             purchase_description=purchase_description,
             purchase_amount=purchase_amount,
             commission_rate=COMMISSION_RATE,
-            amount=commission_amount,
             stripe_payment_intent_id=stripe_payment_intent_id,
             stripe_invoice_id=stripe_invoice_id,
             status='pending'
         )
 
-        # Update affiliate stats
-        referral.affiliate.update_stats()
+        # Update affiliate stats once for both changes (debounced, off the webhook path)
+        schedule_stats_update(referral.affiliate)
 
     return commission
 
 
 def get_referral_for_user(user) -> Referral | None:
     """Get the referral record for a user, if any."""
-    try:
-        return Referral.objects.select_related('affiliate').get(referred_user=user)
-    except Referral.DoesNotExist:
-        return None
+    return Referral.objects.select_related('affiliate').filter(referred_user=user).first()
@@ -0,0 +1,85 @@
+"""
+Deferred affiliate stats recomputation.
+
+Affiliate.update_stats() runs aggregate queries over every referral and
+commission. Callers that change them (signups, purchase webhooks, admin
+actions) schedule it here instead. The affiliate is marked stale
+(stats_dirty_at) in the caller's transaction; once that commits, the
+recompute runs on a background thread after a short delay, and a cache key
+coalesces bursts into a single recompute per affiliate. The affiliate
+dashboard reads the stored totals, which trail a change by at most
+STATS_DEBOUNCE_SECONDS.
+
+The timer lives in the web process, so one pending at a deploy or crash is
+lost; the stale mark is not. run_affiliate_stats() in the cron runners
+recomputes whatever is still marked.
+"""
+import logging
+import threading
+from functools import partial
+
+from django.core.cache import cache
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+STATS_DEBOUNCE_SECONDS = 30
+
+
+def stats_cache_key(affiliate_id):
+    """Cache key held while an affiliate's recompute is pending."""
+    return f"aff:recompute:{affiliate_id}"
+
+
+def recompute_affiliate_stats(affiliate_id):
+    """Recalculate stats for one affiliate and clear its stale mark."""
+    from apps.affiliates.models import Affiliate
+
+    affiliate = Affiliate.objects.filter(pk=affiliate_id).first()
+    if affiliate is None:
+        return
+    started = timezone.now()
+    affiliate.update_stats()
+    # A change marked after the aggregates were read keeps its mark
+    Affiliate.objects.filter(
+        pk=affiliate_id, stats_dirty_at__lte=started
+    ).update(stats_dirty_at=None)
+
+
+def schedule_stats_update(affiliate):
+    """Queue a debounced stats recompute for this affiliate after the current transaction commits."""
+    schedule_stats_updates([affiliate.pk])
+
+
+def schedule_stats_updates(affiliate_ids):
+    """Queue debounced stats recomputes for several affiliates (e.g. after a bulk update)."""
+    from apps.affiliates.models import Affiliate
+
+    affiliate_ids = set(affiliate_ids)
+    if not affiliate_ids:
+        return
+    # Written with the change itself, so it rolls back with it too
+    Affiliate.objects.filter(pk__in=affiliate_ids).update(stats_dirty_at=timezone.now())
+    transaction.on_commit(partial(_start_timers, affiliate_ids))
+
+
+def _start_timers(affiliate_ids):
+    for affiliate_id in affiliate_ids:
+        key = stats_cache_key(affiliate_id)
+        if not cache.add(key, 1, STATS_DEBOUNCE_SECONDS):
+            continue  # A recompute is already pending and will see this change
+        timer = threading.Timer(STATS_DEBOUNCE_SECONDS, _run_and_release, args=(affiliate_id, key))
+        timer.daemon = True
+        timer.start()
+
+
+def _run_and_release(affiliate_id, key):
+    cache.delete(key)
+    close_old_connections()
+    try:
+        recompute_affiliate_stats(affiliate_id)
+    except Exception as e:
+        logger.error(f"Failed to recompute stats for affiliate {affiliate_id}: {e}", exc_info=True)
+    finally:
+        connection.close()
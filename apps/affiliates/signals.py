@@ -5,11 +5,14 @@ Handles:
 1. Connecting referral cookies to new user signups
 2. Creating commissions when referred users make purchases
 """
+import uuid
+
 from django.dispatch import receiver
 from django.db import transaction
 from allauth.account.signals import user_signed_up
 
 from .models import Referral
+from .services.stats import schedule_stats_update
 
 
 @receiver(user_signed_up)
@@ -22,20 +25,21 @@ def connect_referral_to_user(request, user, **kwargs):
         return
 
     try:
-        # Find the referral by visitor_id
-        referral = Referral.objects.get(visitor_id=referral_cookie)
+        visitor_id = uuid.UUID(referral_cookie)
+    except ValueError:
+        return  # Malformed cookie, nothing to look up
 
-        # Don't allow self-referrals
-        if referral.affiliate.user == user:
-            return
+    referral = Referral.objects.select_related('affiliate').filter(visitor_id=visitor_id).first()
+    if referral is None:
+        return  # Invalid or expired referral cookie
 
-        # Connect the user to the referral
-        referral.referred_user = user
-        referral.save(update_fields=['referred_user'])
+    # Don't allow self-referrals
+    if referral.affiliate.user_id == user.pk:
+        return
 
-        # Update affiliate stats
-        referral.affiliate.update_stats()
+    # Connect the user to the referral
+    referral.referred_user = user
+    referral.save(update_fields=['referred_user'])
 
-    except (Referral.DoesNotExist, ValueError):
-        # Invalid or expired referral cookie, ignore
-        pass
+    # Update affiliate stats (debounced, off the signup path)
+    schedule_stats_update(referral.affiliate)
@@ -0,0 +1,247 @@
+"""
+Tests for the affiliate program: referral codes, application approval,
+referral tracking, stats recomputes and the keyset-paginated list views.
+"""
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.accounts.models import CustomUser
+from apps.affiliates.models import (
+    REFERRAL_CODE_ATTEMPTS, Affiliate, AffiliateApplication, Referral,
+)
+from apps.affiliates.pagination import decode_cursor, encode_cursor
+from apps.affiliates.services.stats import schedule_stats_update, stats_cache_key
+from apps.affiliates.signals import connect_referral_to_user
+from apps.invoices.cron import run_affiliate_stats
+
+
+def make_user(email):
+    return CustomUser.objects.create_user(
+        username=email.split('@')[0],
+        email=email,
+        password='testpass123',
+    )
+
+
+def make_affiliate(email='affiliate@test.com', **kwargs):
+    return Affiliate.objects.create(user=make_user(email), status='approved', **kwargs)
+
+
+class ReferralCodeTests(TestCase):
+
+    def setUp(self):
+        make_affiliate(referral_code='TAKEN123')
+
+    @patch('apps.affiliates.models.generate_referral_code', return_value='FRESH123')
+    def test_colliding_code_is_regenerated(self, generate):
+        affiliate = make_affiliate('second@test.com', referral_code='taken123')
+
+        generate.assert_called_once()
+        self.assertEqual(affiliate.referral_code, 'FRESH123')
+        self.assertEqual(Affiliate.objects.get(pk=affiliate.pk).referral_code, 'FRESH123')
+
+    @patch('apps.affiliates.models.generate_referral_code', return_value='TAKEN123')
+    def test_gives_up_after_repeated_collisions(self, generate):
+        with self.assertRaises(IntegrityError):
+            make_affiliate('second@test.com', referral_code='TAKEN123')
+
+        self.assertEqual(generate.call_count, REFERRAL_CODE_ATTEMPTS - 1)
+
+    @patch('apps.affiliates.models.generate_referral_code')
+    def test_other_integrity_errors_are_not_retried(self, generate):
+        user = Affiliate.objects.get(referral_code='TAKEN123').user
+
+        with self.assertRaises(IntegrityError):
+            Affiliate.objects.create(user=user, referral_code='OTHER123')
+
+        generate.assert_not_called()
+
+
+class ApproveApplicationsActionTests(TestCase):
+
+    def setUp(self):
+        self.taken = make_affiliate(referral_code='TAKEN123')
+        admin_user = make_user('admin@test.com')
+        admin_user.is_staff = admin_user.is_superuser = True
+        admin_user.save()
+        self.client.force_login(admin_user)
+
+    def approve(self, *applications):
+        return self.client.post(
+            reverse('admin:affiliates_affiliateapplication_changelist'),
+            {
+                'action': 'approve_applications',
+                '_selected_action': [application.pk for application in applications],
+            },
+        )
+
+    def apply(self, user):
+        return AffiliateApplication.objects.create(user=user, promotion_methods='Blog')
+
+    @patch('apps.affiliates.models.secrets.token_urlsafe', side_effect=['TAKEN123', 'FRESH123'])
+    def test_colliding_code_is_regenerated_for_new_profile(self, token):
+        applicant = make_user('applicant@test.com')
+
+        self.approve(self.apply(applicant))
+
+        affiliate = Affiliate.objects.get(user=applicant)
+        self.assertEqual(affiliate.referral_code, 'FRESH123')
+        self.assertEqual(affiliate.status, 'approved')
+
+    def test_existing_profile_is_approved_in_place(self):
+        pending = make_affiliate('pending@test.com')
+        Affiliate.objects.filter(pk=pending.pk).update(status='pending')
+        new_user = make_user('new@test.com')
+
+        self.approve(self.apply(pending.user), self.apply(new_user))
+
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, 'approved')
+        self.assertIsNotNone(pending.approved_at)
+        self.assertTrue(Affiliate.objects.filter(user=new_user, status='approved').exists())
+        self.assertFalse(AffiliateApplication.objects.filter(reviewed=False).exists())
+
+
+class ReferralTrackingTests(TestCase):
+
+    def setUp(self):
+        self.affiliate = make_affiliate()
+
+    def test_click_records_referral_before_responding(self):
+        response = self.client.get(f'/ref/{self.affiliate.referral_code.lower()}/')
+
+        self.assertEqual(response.status_code, 302)
+        visitor_id = response.cookies['ref'].value
+        self.assertTrue(Referral.objects.filter(
+            affiliate=self.affiliate, visitor_id=visitor_id
+        ).exists())
+
+    def test_signup_right_after_click_is_attributed(self):
+        response = self.client.get(f'/ref/{self.affiliate.referral_code}/')
+        request = RequestFactory().get('/accounts/signup/')
+        request.COOKIES['ref'] = response.cookies['ref'].value
+        new_user = make_user('referred@test.com')
+
+        connect_referral_to_user(request, new_user)
+
+        referral = Referral.objects.get(affiliate=self.affiliate)
+        self.assertEqual(referral.referred_user, new_user)
+
+    def test_unknown_code_records_nothing(self):
+        response = self.client.get('/ref/NOPE1234/')
+
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn('ref', response.cookies)
+        self.assertFalse(Referral.objects.exists())
+
+
+class StatsScheduleTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.affiliate = make_affiliate()
+
+    @patch('apps.affiliates.services.stats.threading.Timer')
+    def test_rolled_back_change_schedules_nothing(self, timer):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    schedule_stats_update(self.affiliate)
+                    raise RuntimeError('rolled back')
+            except RuntimeError:
+                pass
+
+        timer.assert_not_called()
+        self.assertIsNone(cache.get(stats_cache_key(self.affiliate.pk)))
+        self.affiliate.refresh_from_db()
+        self.assertIsNone(self.affiliate.stats_dirty_at)
+
+    @patch('apps.affiliates.services.stats.threading.Timer')
+    def test_committed_change_marks_stale_and_starts_one_timer(self, timer):
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule_stats_update(self.affiliate)
+            schedule_stats_update(self.affiliate)
+
+        self.assertEqual(timer.call_count, 1)
+        self.affiliate.refresh_from_db()
+        self.assertIsNotNone(self.affiliate.stats_dirty_at)
+
+    def test_cron_sweep_recomputes_stale_affiliates(self):
+        Referral.objects.create(affiliate=self.affiliate)
+        Affiliate.objects.filter(pk=self.affiliate.pk).update(
+            stats_dirty_at=timezone.now() - timedelta(hours=1)
+        )
+
+        self.assertEqual(run_affiliate_stats(), {'recomputed': 1, 'failed': 0})
+
+        self.affiliate.refresh_from_db()
+        self.assertEqual(self.affiliate.total_referrals, 1)
+        self.assertIsNone(self.affiliate.stats_dirty_at)
+
+
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        self.affiliate = make_affiliate()
+        base = timezone.now()
+        for i in range(45):
+            referral = Referral.objects.create(affiliate=self.affiliate)
+            # Pairs share a timestamp, so page edges fall inside ties and the
+            # pk tie-breaker decides the order.
+            Referral.objects.filter(pk=referral.pk).update(
+                created_at=base - timedelta(minutes=i // 2)
+            )
+        self.newest_first = list(
+            Referral.objects.filter(affiliate=self.affiliate).order_by('-created_at', '-pk')
+        )
+        self.client.force_login(self.affiliate.user)
+
+    def get_page(self, **params):
+        response = self.client.get(reverse('affiliates:referrals'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.context['page_obj']
+
+    def test_cursor_round_trips(self):
+        referral = self.newest_first[0]
+        self.assertEqual(
+            decode_cursor(encode_cursor(referral)), (referral.created_at, referral.pk)
+        )
+        self.assertIsNone(decode_cursor('not-a-cursor'))
+
+    def test_after_walks_every_row_once(self):
+        first = self.get_page()
+        second = self.get_page(after=first.next_cursor)
+        last = self.get_page(after=second.next_cursor)
+
+        self.assertEqual(list(first), self.newest_first[:20])
+        self.assertEqual(list(second), self.newest_first[20:40])
+        self.assertEqual(list(last), self.newest_first[40:])
+        self.assertFalse(first.has_previous())
+        self.assertTrue(second.has_previous() and second.has_next())
+        self.assertFalse(last.has_next())
+
+    def test_before_returns_the_previous_page(self):
+        second = self.get_page(after=self.get_page().next_cursor)
+
+        previous = self.get_page(before=second.previous_cursor)
+
+        self.assertEqual(list(previous), self.newest_first[:20])
+        self.assertFalse(previous.has_previous())
+        self.assertTrue(previous.has_next())
+
+    def test_before_from_the_last_page(self):
+        last = self.get_page(after=encode_cursor(self.newest_first[39]))
+
+        previous = self.get_page(before=last.previous_cursor)
+
+        self.assertEqual(list(previous), self.newest_first[20:40])
+        self.assertTrue(previous.has_previous())
+
+    def test_malformed_cursor_falls_back_to_first_page(self):
+        self.assertEqual(list(self.get_page(after='bogus')), self.newest_first[:20])
@@ -5,12 +5,13 @@ from django.contrib import messages
 from django.views.generic import TemplateView, CreateView, ListView
 from django.http import HttpResponseRedirect
 from django.urls import reverse
-from django.db.models import Sum
+from django.db.models import Count, Q, Sum
 from django.utils import timezone
 from datetime import timedelta
 
 from .models import Affiliate, Referral, Commission, AffiliateApplication
 from .forms import AffiliateApplicationForm
+from .pagination import KeysetPaginationMixin
 
 
 class AffiliateDashboardView(LoginRequiredMixin, TemplateView):
@@ -34,22 +35,21 @@ class AffiliateDashboardView(LoginRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         affiliate = self.request.user.affiliate_profile
 
-        # Update stats
-        affiliate.update_stats()
+        # Get recent referrals (the template shows the referred user's email)
+        recent_referrals = list(affiliate.referrals.select_related('referred_user')[:10])
 
-        # Get recent referrals
-        recent_referrals = affiliate.referrals.select_related('referred_user')[:10]
+        # Get recent commissions (the template reads only commission columns,
+        # so no join to referral)
+        recent_commissions = list(affiliate.commissions.all()[:10])
 
-        # Get recent commissions
-        recent_commissions = affiliate.commissions.select_related('referral')[:10]
-
-        # Calculate stats for the last 30 days
+        # Calculate stats for the last 30 days (one query per table)
         thirty_days_ago = timezone.now() - timedelta(days=30)
-        monthly_referrals = affiliate.referrals.filter(created_at__gte=thirty_days_ago).count()
-        monthly_conversions = affiliate.referrals.filter(
-            converted=True,
-            converted_at__gte=thirty_days_ago
-        ).count()
+        referral_stats = affiliate.referrals.aggregate(
+            referrals=Count('id', filter=Q(created_at__gte=thirty_days_ago)),
+            conversions=Count('id', filter=Q(converted=True, converted_at__gte=thirty_days_ago)),
+        )
+        monthly_referrals = referral_stats['referrals']
+        monthly_conversions = referral_stats['conversions']
         monthly_earnings = affiliate.commissions.filter(
             created_at__gte=thirty_days_ago
         ).aggregate(total=Sum('amount'))['total'] or 0
@@ -81,11 +81,14 @@ class AffiliateApplyView(LoginRequiredMixin, TemplateView):
         except Affiliate.DoesNotExist:
             context['already_affiliate'] = False
 
-        # Check for pending applications
-        pending_app = AffiliateApplication.objects.filter(
-            user=self.request.user,
-            reviewed=False
-        ).first()
+        # Check for pending applications. The template only shows one to
+        # non-affiliates, and only needs its submission date.
+        pending_app = None
+        if not context['already_affiliate']:
+            pending_app = AffiliateApplication.objects.filter(
+                user=self.request.user,
+                reviewed=False
+            ).only('id', 'created_at').first()
         context['pending_application'] = pending_app
 
         # Form for new applications
@@ -117,7 +120,7 @@ class AffiliateApplyView(LoginRequiredMixin, TemplateView):
         return render(request, self.template_name, context)
 
 
-class AffiliateCommissionsView(LoginRequiredMixin, ListView):
+class AffiliateCommissionsView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """View all commissions for an affiliate."""
     template_name = 'affiliates/commissions.html'
     context_object_name = 'commissions'
@@ -126,12 +129,12 @@ class AffiliateCommissionsView(LoginRequiredMixin, ListView):
     def get_queryset(self):
         try:
             affiliate = self.request.user.affiliate_profile
-            return affiliate.commissions.select_related('referral').order_by('-created_at')
+            return affiliate.commissions.all()
         except Affiliate.DoesNotExist:
             return Commission.objects.none()
 
 
-class AffiliateReferralsView(LoginRequiredMixin, ListView):
+class AffiliateReferralsView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """View all referrals for an affiliate."""
     template_name = 'affiliates/referrals.html'
     context_object_name = 'referrals'
@@ -140,7 +143,7 @@ class AffiliateReferralsView(LoginRequiredMixin, ListView):
     def get_queryset(self):
         try:
             affiliate = self.request.user.affiliate_profile
-            return affiliate.referrals.select_related('referred_user').order_by('-created_at')
+            return affiliate.referrals.select_related('referred_user')
         except Affiliate.DoesNotExist:
             return Referral.objects.none()
 
@@ -150,13 +153,17 @@ def referral_redirect(request, code):
     Handle referral link clicks.
     Sets a cookie to track the referral and redirects to the homepage.
     """
-    try:
-        affiliate = Affiliate.objects.get(referral_code=code.upper(), status='approved')
-    except Affiliate.DoesNotExist:
+    # Only the pk is needed to record the referral
+    affiliate = Affiliate.objects.filter(
+        referral_code=code.upper(), status='approved'
+    ).only('id').first()
+    if affiliate is None:
         # Invalid or inactive referral code, just redirect to homepage
         return redirect('landing')
 
-    # Create referral record
+    # Create referral record. This stays a synchronous single-row INSERT: the
+    # signup hook attributes the visitor by looking this row up, so it must
+    # exist before the ref cookie can come back.
     referral = Referral.objects.create(
         affiliate=affiliate,
         ip_address=get_client_ip(request),
@@ -178,12 +185,18 @@ def referral_redirect(request, code):
 
 
 def get_client_ip(request):
-    """Get the client's IP address from the request."""
+    """Get the client's IP address from the request (memoized on the request)."""
+    try:
+        return request._client_ip
+    except AttributeError:
+        pass
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
     if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0].strip()
+        # Only the first hop matters; don't build the whole list
+        ip = x_forwarded_for.partition(',')[0].strip()
     else:
         ip = request.META.get('REMOTE_ADDR')
+    request._client_ip = ip
     return ip
 
 
@@ -1,9 +1,15 @@
 """
 API Key authentication for REST API.
 """
+import hmac
+
+from django.core.cache import cache
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
-from apps.accounts.models import CustomUser
+from apps.accounts.models import (
+    API_KEY_AUTH_FIELDS, API_KEY_CACHE_TTL, CustomUser, api_key_cache_key, hash_api_key,
+    tier_has_api_access,
+)
 
 
 class APIKeyAuthentication(BaseAuthentication):
@@ -21,17 +27,35 @@ class APIKeyAuthentication(BaseAuthentication):
         if not api_key:
             return None  # No API key provided, try other auth methods
 
-        try:
-            user = CustomUser.objects.get(api_key=api_key)
-        except CustomUser.DoesNotExist:
+        # Keys are matched on their digest, never the raw value, and the
+        # digest is re-checked in constant time. Only the fields needed to
+        # accept or reject the key are cached under the digest; saving or
+        # deleting the user (or rotating the key) drops them. Usage counters
+        # change without a save, so the user row itself is read per request.
+        key_hash = hash_api_key(api_key)
+        cache_key = api_key_cache_key(key_hash)
+        auth = cache.get(cache_key)
+        user = None
+        if auth is None:
+            user = CustomUser.objects.filter(api_key_hash=key_hash).first()
+            if user is not None:
+                auth = {field: getattr(user, field) for field in API_KEY_AUTH_FIELDS}
+                auth['api_key_hash'] = bytes(user.api_key_hash)
+                cache.set(cache_key, auth, API_KEY_CACHE_TTL)
+        if auth is None or not hmac.compare_digest(auth['api_key_hash'], key_hash):
             raise AuthenticationFailed('Invalid API key')
 
-        if not user.is_active:
+        if not auth['is_active']:
             raise AuthenticationFailed('User account is disabled')
 
-        if not user.has_api_access():
+        if not tier_has_api_access(auth['subscription_tier']):
             raise AuthenticationFailed('API access not available on your plan')
 
+        if user is None:
+            user = CustomUser.objects.filter(pk=auth['pk']).first()
+            if user is None:
+                raise AuthenticationFailed('Invalid API key')
+
         # Check API call limit
         if not user.can_make_api_call():
             raise AuthenticationFailed('API call limit exceeded for this month')
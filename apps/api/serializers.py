@@ -1,11 +1,45 @@
 """
 API Serializers for InvoiceKits.
 """
+from django.db import transaction
+from django.db.models.manager import BaseManager
 from rest_framework import serializers
 from apps.invoices.models import Invoice, LineItem
 from apps.companies.models import Company
 
 
+class FlatListSerializer(serializers.ListSerializer):
+    """
+    Output-side ListSerializer for children whose fields all read a plain
+    attribute or method of the instance.
+
+    The child's fields are resolved once per list, then each row is built in a
+    tight loop, skipping Serializer.to_representation's per-row, per-field
+    attribute lookup and SkipField handling. Output matches the child's.
+    """
+
+    def to_representation(self, data):
+        rows = data.all() if isinstance(data, BaseManager) else data
+
+        readers = []
+        for field in self.child._readable_fields:
+            assert len(field.source_attrs) == 1, (
+                f'{field.field_name} needs a single-attribute source for FlatListSerializer'
+            )
+            readers.append((field.field_name, field.source_attrs[0], field.to_representation))
+
+        result = []
+        for obj in rows:
+            row = {}
+            for name, attr, to_representation in readers:
+                value = getattr(obj, attr)
+                if callable(value):
+                    value = value()
+                row[name] = None if value is None else to_representation(value)
+            result.append(row)
+        return result
+
+
 class LineItemSerializer(serializers.ModelSerializer):
     """Serializer for invoice line items."""
 
@@ -13,6 +47,7 @@ class LineItemSerializer(serializers.ModelSerializer):
         model = LineItem
         fields = ['id', 'description', 'quantity', 'rate', 'amount', 'order']
         read_only_fields = ['id', 'amount']
+        list_serializer_class = FlatListSerializer
 
 
 class InvoiceListSerializer(serializers.ModelSerializer):
@@ -26,6 +61,7 @@ class InvoiceListSerializer(serializers.ModelSerializer):
             'status', 'total', 'currency', 'currency_symbol',
             'due_date', 'created_at'
         ]
+        list_serializer_class = FlatListSerializer
 
 
 class InvoiceDetailSerializer(serializers.ModelSerializer):
@@ -83,6 +119,7 @@ class InvoiceCreateSerializer(serializers.ModelSerializer):
             )
         return value
 
+    @transaction.atomic
     def create(self, validated_data):
         line_items_data = validated_data.pop('line_items')
         user = self.context['request'].user
@@ -100,14 +137,16 @@ class InvoiceCreateSerializer(serializers.ModelSerializer):
             **validated_data
         )
 
-        # Create line items
-        for idx, item_data in enumerate(line_items_data):
-            LineItem.objects.create(invoice=invoice, order=idx, **item_data)
+        # Create line items in one INSERT
+        line_items = LineItem.objects.bulk_create([
+            LineItem(invoice=invoice, **{**item_data, 'order': idx})
+            for idx, item_data in enumerate(line_items_data)
+        ])
 
-        # Calculate totals and due date
+        # Calculate totals and due date from the items in hand; one UPDATE
         invoice.due_date = invoice.calculate_due_date()
-        invoice.calculate_totals()
-        invoice.save()
+        invoice.calculate_totals(line_items)
+        invoice.save_totals()
 
         # Increment user's invoice count
         user.increment_invoice_count()
@@ -128,13 +167,3 @@ class BatchInvoiceSerializer(serializers.Serializer):
     currency = serializers.CharField(max_length=3, required=False, default='USD')
     payment_terms = serializers.CharField(max_length=20, required=False, default='net_30')
     notes = serializers.CharField(required=False, allow_blank=True)
-
-
-class TemplateSerializer(serializers.Serializer):
-    """Serializer for invoice templates."""
-    id = serializers.CharField()
-    name = serializers.CharField()
-    description = serializers.CharField()
-    best_for = serializers.CharField()
-    premium = serializers.BooleanField()
-    available = serializers.BooleanField()
@@ -0,0 +1,101 @@
+"""
+Tests for the v1 API: API-key authentication and conditional template
+listing.
+"""
+from django.core.cache import cache
+from django.test import TestCase
+
+from rest_framework.test import APIClient
+
+from apps.accounts.models import CustomUser
+
+USAGE_URL = '/api/v1/usage/'
+TEMPLATES_URL = '/api/v1/templates/'
+
+
+def make_api_user(email='api@test.com', tier='business'):
+    return CustomUser.objects.create_user(
+        username=email.split('@')[0],
+        email=email,
+        password='testpass123',
+        subscription_tier=tier,
+        subscription_status='active',
+    )
+
+
+class APIKeyAuthenticationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_api_user()
+        self.api_key = self.user.generate_api_key()
+        self.client = APIClient()
+
+    def get_usage(self, api_key=None):
+        return self.client.get(USAGE_URL, HTTP_X_API_KEY=api_key or self.api_key)
+
+    def test_valid_key_authenticates(self):
+        response = self.get_usage()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['subscription_tier'], 'business')
+
+    def test_counters_are_read_fresh_while_key_is_cached(self):
+        self.get_usage()  # Caches the key
+        # Usage counters change with .update(), which sends no post_save
+        CustomUser.objects.filter(pk=self.user.pk).update(invoices_created_this_month=7)
+
+        response = self.get_usage()
+        self.assertEqual(response.json()['invoices']['used'], 7)
+
+    def test_plan_change_applies_to_cached_key(self):
+        self.get_usage()
+        self.user.subscription_tier = 'professional'
+        self.user.save(update_fields=['subscription_tier'])
+
+        self.assertEqual(self.get_usage().status_code, 401)
+
+    def test_rotated_key_stops_working(self):
+        self.get_usage()
+        new_key = self.user.generate_api_key()
+
+        self.assertEqual(self.get_usage().status_code, 401)
+        self.assertEqual(self.get_usage(new_key).status_code, 200)
+
+    def test_wrong_key_with_matching_prefix_is_rejected(self):
+        # The stored prefix is for display only; the whole key must match
+        tail = self.api_key[12:]
+        forged = self.api_key[:12] + ('A' if tail[0] != 'A' else 'B') + tail[1:]
+
+        self.assertEqual(self.get_usage(forged).status_code, 401)
+        self.get_usage()  # With the real key cached
+        self.assertEqual(self.get_usage(forged).status_code, 401)
+
+
+class TemplateListETagTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        user = make_api_user()
+        self.client = APIClient(HTTP_X_API_KEY=user.generate_api_key())
+
+    def test_list_carries_an_etag(self):
+        response = self.client.get(TEMPLATES_URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'])
+        self.assertTrue(all(template['available'] for template in response.json()))
+
+    def test_matching_if_none_match_returns_304(self):
+        etag = self.client.get(TEMPLATES_URL)['ETag']
+
+        for header in (etag, f'W/{etag}', f'"stale", {etag}'):
+            response = self.client.get(TEMPLATES_URL, HTTP_IF_NONE_MATCH=header)
+            self.assertEqual(response.status_code, 304, header)
+            self.assertEqual(response['ETag'], etag)
+            self.assertEqual(response.content, b'')
+
+    def test_stale_etag_returns_the_list(self):
+        response = self.client.get(TEMPLATES_URL, HTTP_IF_NONE_MATCH='"stale"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json())
@@ -1,12 +1,15 @@
 """
 API Views for InvoiceKits.
 """
+import hashlib
+import json
+
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.conf import settings
-from django.http import FileResponse
+from django.http import FileResponse, HttpResponseNotModified, JsonResponse
 
 from apps.invoices.models import Invoice, LineItem
 from apps.invoices.services.pdf_generator import InvoicePDFGenerator
@@ -14,7 +17,6 @@ from .serializers import (
     InvoiceListSerializer,
     InvoiceDetailSerializer,
     InvoiceCreateSerializer,
-    TemplateSerializer,
 )
 from .authentication import APIKeyAuthentication
 
@@ -32,6 +34,12 @@ class InvoiceViewSet(viewsets.ModelViewSet):
     authentication_classes = [APIKeyAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
+    # Columns InvoiceListSerializer reads
+    LIST_FIELDS = (
+        'id', 'invoice_number', 'client_name', 'client_email',
+        'status', 'total', 'currency', 'due_date', 'created_at',
+    )
+
     def get_serializer_class(self):
         if self.action == 'list':
             return InvoiceListSerializer
@@ -40,9 +48,13 @@ class InvoiceViewSet(viewsets.ModelViewSet):
         return InvoiceDetailSerializer
 
     def get_queryset(self):
-        return Invoice.objects.filter(
+        qs = Invoice.objects.filter(
             company__user=self.request.user
-        ).prefetch_related('line_items').order_by('-created_at')
+        ).order_by('-created_at')
+        if self.action == 'list':
+            # The list serializer has no line items; select only its columns
+            return qs.only(*self.LIST_FIELDS)
+        return qs.prefetch_related('line_items')
 
     def perform_create(self, serializer):
         # Check if user can create more invoices
@@ -58,14 +70,15 @@ class InvoiceViewSet(viewsets.ModelViewSet):
         invoice = self.get_object()
 
         generator = InvoicePDFGenerator(invoice)
-        pdf_bytes = generator.generate()
 
-        response = FileResponse(
-            iter([pdf_bytes]),
-            content_type='application/pdf'
+        # Re-downloads of an unchanged invoice reuse the stored PDF;
+        # FileResponse streams the file in blocks and closes it
+        return FileResponse(
+            generator.get_or_generate_file(),
+            content_type='application/pdf',
+            as_attachment=True,
+            filename=f'{invoice.invoice_number}.pdf',
         )
-        response['Content-Disposition'] = f'attachment; filename="{invoice.invoice_number}.pdf"'
-        return response
 
     @action(detail=True, methods=['post'])
     def send(self, request, pk=None):
@@ -82,28 +95,50 @@ class InvoiceViewSet(viewsets.ModelViewSet):
         return Response({'status': 'paid'})
 
 
+# The template catalog only changes on deploy, so it is built once; requests
+# just add each user's "available" flag.
+_TEMPLATE_BASE = tuple(
+    {
+        'id': key,
+        'name': value['name'],
+        'description': value['description'],
+        'best_for': value['best_for'],
+        'premium': value.get('premium', False),
+    }
+    for key, value in settings.INVOICE_TEMPLATES.items()
+)
+_TEMPLATE_BASE_HASH = hashlib.blake2b(
+    json.dumps(_TEMPLATE_BASE, sort_keys=True).encode(), digest_size=8
+).hexdigest()
+
+
+def template_list_etag(available):
+    """ETag for the template list as seen with the given available slugs."""
+    avail_hash = hashlib.blake2b(
+        ','.join(sorted(available)).encode(), digest_size=8
+    ).hexdigest()
+    return f'"{_TEMPLATE_BASE_HASH}:{avail_hash}"'
+
+
 class TemplateListView(APIView):
     """List available invoice templates."""
     authentication_classes = [APIKeyAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        available_templates = user.get_available_templates()
-
-        templates = []
-        for key, value in settings.INVOICE_TEMPLATES.items():
-            templates.append({
-                'id': key,
-                'name': value['name'],
-                'description': value['description'],
-                'best_for': value['best_for'],
-                'premium': value.get('premium', False),
-                'available': key in available_templates,
-            })
-
-        serializer = TemplateSerializer(templates, many=True)
-        return Response(serializer.data)
+        available = frozenset(request.user.get_available_templates())
+        etag = template_list_etag(available)
+
+        if_none_match = request.headers.get('If-None-Match', '')
+        if etag in (tag.strip().removeprefix('W/') for tag in if_none_match.split(',')):
+            response = HttpResponseNotModified()
+        else:
+            response = Response([
+                {**template, 'available': template['id'] in available}
+                for template in _TEMPLATE_BASE
+            ])
+        response['ETag'] = etag
+        return response
 
 
 class UsageView(APIView):
@@ -112,10 +147,14 @@ class UsageView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
+        # Everything here is already on the authenticated user: the counters
+        # were brought up to date (month reset, buffered API count) during
+        # authentication, so this view makes no queries.
         user = request.user
-        tier_config = settings.SUBSCRIPTION_TIERS.get(user.subscription_tier, {})
+        tier_config = user.tier_config
 
-        return Response({
+        # Server-built payloads; plain JsonResponse skips DRF's renderer pipeline.
+        return JsonResponse({
             'subscription_tier': user.subscription_tier,
             'invoices': {
                 'used': user.invoices_created_this_month,
@@ -140,7 +179,7 @@ class UsageView(APIView):
 @permission_classes([permissions.AllowAny])
 def api_info(request):
     """API information and version."""
-    return Response({
+    return JsonResponse({
         'name': 'InvoiceKits API',
         'version': '1.0.0',
         'documentation': request.build_absolute_uri('/api/docs/'),
@@ -1,6 +1,7 @@
 """
 Invoice serializers for API v2.
 """
+from django.db import transaction
 from rest_framework import serializers
 
 from apps.companies.models import Company
@@ -137,6 +138,7 @@ class InvoiceCreateV2Serializer(serializers.ModelSerializer):
             )
         return value
 
+    @transaction.atomic
     def create(self, validated_data):
         line_items_data = validated_data.pop('line_items')
         user = self.context['request'].user
@@ -154,22 +156,26 @@ class InvoiceCreateV2Serializer(serializers.ModelSerializer):
             **validated_data,
         )
 
-        # Create line items — use the client-supplied order when present,
-        # otherwise fall back to the iteration index.
+        # Create line items in one INSERT — use the client-supplied order
+        # when present, otherwise fall back to the iteration index.
         for idx, item_data in enumerate(line_items_data):
             item_data.setdefault('order', idx)
-            LineItem.objects.create(invoice=invoice, **item_data)
+        line_items = LineItem.objects.bulk_create([
+            LineItem(invoice=invoice, **item_data) for item_data in line_items_data
+        ])
 
-        # Calculate due date based on payment terms and recalculate totals
+        # Calculate due date based on payment terms and totals from the
+        # items in hand, then write them in one UPDATE
         invoice.due_date = invoice.calculate_due_date()
-        invoice.calculate_totals()
-        invoice.save()
+        invoice.calculate_totals(line_items)
+        invoice.save_totals()
 
         # Track invoice usage for billing tier enforcement
         user.increment_invoice_count()
 
         return invoice
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         line_items_data = validated_data.pop('line_items', None)
 
@@ -182,7 +188,9 @@ class InvoiceCreateV2Serializer(serializers.ModelSerializer):
             instance.line_items.all().delete()
             for idx, item_data in enumerate(line_items_data):
                 item_data.setdefault('order', idx)
-                LineItem.objects.create(invoice=instance, **item_data)
+            LineItem.objects.bulk_create([
+                LineItem(invoice=instance, **item_data) for item_data in line_items_data
+            ])
 
         # Recalculate due date and totals after any update
         instance.due_date = instance.calculate_due_date()
@@ -14,6 +14,7 @@ Covers:
 - Query param filters: ?status= and ?search=
 """
 from decimal import Decimal
+from io import BytesIO
 from unittest.mock import patch, MagicMock
 
 from django.test import TestCase
@@ -371,13 +372,14 @@ class InvoicePDFTests(InvoiceTestBase):
     @patch('apps.api_v2.views.invoices.InvoicePDFGenerator')
     def test_pdf_returns_200_with_pdf_content_type(self, mock_generator_class):
         mock_generator = MagicMock()
-        mock_generator.generate.return_value = b'%PDF-1.4 fake content'
+        mock_generator.get_or_generate_file.return_value = BytesIO(b'%PDF-1.4 fake content')
         mock_generator_class.return_value = mock_generator
 
         response = self.client.get(action_url(self.invoice.pk, 'pdf'))
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response['Content-Type'], 'application/pdf')
         self.assertIn(self.invoice.invoice_number, response['Content-Disposition'])
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4 fake content')
 
     @patch('apps.api_v2.views.invoices.InvoicePDFGenerator')
     def test_pdf_for_other_users_invoice_returns_404(self, mock_generator_class):
@@ -89,7 +89,7 @@ def usage_view(request):
         'payment_source': user.payment_source,
         'invoices': invoice_usage,
         'api_calls': {
-            'used': user.api_calls_this_month,
+            'used': user.get_api_calls_this_month(),
             'limit': None if api_unlimited else api_limit,
             'unlimited': api_unlimited,
         },
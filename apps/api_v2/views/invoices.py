@@ -43,6 +43,13 @@ class InvoiceV2ViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     pagination_class = None
 
+    # Columns InvoiceListV2Serializer reads
+    LIST_FIELDS = (
+        'id', 'invoice_number', 'invoice_name', 'client_name', 'client_email',
+        'status', 'total', 'currency', 'due_date', 'created_at',
+        'reminders_paused', 'late_fees_paused', 'late_fee_applied',
+    )
+
     # ------------------------------------------------------------------
     # Serializer dispatch
     # ------------------------------------------------------------------
@@ -60,11 +67,12 @@ class InvoiceV2ViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        qs = (
-            Invoice.objects.filter(company__user=user)
-            .prefetch_related('line_items')
-            .order_by('-created_at')
-        )
+        qs = Invoice.objects.filter(company__user=user).order_by('-created_at')
+        if self.action == 'list':
+            # The list serializer has no line items; select only its columns
+            qs = qs.only(*self.LIST_FIELDS)
+        else:
+            qs = qs.prefetch_related('line_items')
 
         # Optional ?status= filter (e.g. draft, sent, paid, overdue, cancelled)
         status_param = self.request.query_params.get('status')
@@ -115,16 +123,15 @@ class InvoiceV2ViewSet(viewsets.ModelViewSet):
         """Generate and stream the invoice PDF."""
         invoice = self.get_object()
         generator = InvoicePDFGenerator(invoice)
-        pdf_bytes = generator.generate()
 
-        response = FileResponse(
-            iter([pdf_bytes]),
+        # Re-downloads of an unchanged invoice reuse the stored PDF;
+        # FileResponse streams the file in blocks and closes it
+        return FileResponse(
+            generator.get_or_generate_file(),
             content_type='application/pdf',
+            as_attachment=True,
+            filename=f'{invoice.invoice_number}.pdf',
         )
-        response['Content-Disposition'] = (
-            f'attachment; filename="{invoice.invoice_number}.pdf"'
-        )
-        return response
 
     @action(detail=True, methods=['post'])
     def send(self, request, pk=None):
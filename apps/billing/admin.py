@@ -2,12 +2,13 @@
 Admin configuration for billing app.
 """
 from django.contrib import admin
-from .models import UsageRecord, PaymentHistory, CreditPurchase, TemplatePurchase
+from .models import UsageRecord, PaymentHistory, CreditPurchase, TemplatePurchase, ProcessedStripeEvent
 
 
 @admin.register(UsageRecord)
 class UsageRecordAdmin(admin.ModelAdmin):
     list_display = ['user', 'month', 'invoices_created', 'api_calls', 'batch_uploads']
+    list_select_related = ['user']
     list_filter = ['month']
     search_fields = ['user__email']
 
@@ -15,6 +16,7 @@ class UsageRecordAdmin(admin.ModelAdmin):
 @admin.register(PaymentHistory)
 class PaymentHistoryAdmin(admin.ModelAdmin):
     list_display = ['user', 'amount', 'currency', 'status', 'created_at']
+    list_select_related = ['user']
     list_filter = ['status', 'currency', 'created_at']
     search_fields = ['user__email', 'stripe_payment_intent_id', 'stripe_invoice_id']
     readonly_fields = ['created_at']
@@ -23,6 +25,7 @@ class PaymentHistoryAdmin(admin.ModelAdmin):
 @admin.register(CreditPurchase)
 class CreditPurchaseAdmin(admin.ModelAdmin):
     list_display = ['user', 'pack_id', 'credits_amount', 'price_paid', 'status', 'created_at']
+    list_select_related = ['user']
     list_filter = ['status', 'pack_id', 'created_at']
     search_fields = ['user__email', 'stripe_session_id', 'stripe_payment_intent_id']
     readonly_fields = ['created_at', 'completed_at']
@@ -32,7 +35,17 @@ class CreditPurchaseAdmin(admin.ModelAdmin):
 @admin.register(TemplatePurchase)
 class TemplatePurchaseAdmin(admin.ModelAdmin):
     list_display = ['user', 'template_id', 'is_bundle', 'price_paid', 'status', 'created_at']
+    list_select_related = ['user']
     list_filter = ['status', 'is_bundle', 'template_id', 'created_at']
     search_fields = ['user__email', 'stripe_session_id', 'stripe_payment_intent_id']
     readonly_fields = ['created_at', 'completed_at']
     ordering = ['-created_at']
+
+
+@admin.register(ProcessedStripeEvent)
+class ProcessedStripeEventAdmin(admin.ModelAdmin):
+    list_display = ['event_id', 'event_type', 'processed_at']
+    list_filter = ['event_type']
+    search_fields = ['event_id']
+    readonly_fields = ['processed_at']
+    ordering = ['-processed_at']
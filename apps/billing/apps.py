@@ -3,8 +3,31 @@ App configuration for billing.
 """
 from django.apps import AppConfig
 
+STRIPE_MAX_NETWORK_RETRIES = 2
+
 
 class BillingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.billing'
     verbose_name = 'Billing'
+
+    def ready(self):
+        """Configure the Stripe SDK once per process."""
+        import stripe
+        from django.conf import settings
+
+        from .services.stripe_limiter import StripeRequestsClient
+
+        stripe.api_key = (
+            settings.STRIPE_LIVE_SECRET_KEY
+            if settings.STRIPE_LIVE_MODE
+            else settings.STRIPE_TEST_SECRET_KEY
+        )
+        # One shared client, so calls reuse pooled connections to api.stripe.com;
+        # it throttles to stay under Stripe's rate limit and logs call timings
+        stripe.default_http_client = StripeRequestsClient(verify_ssl_certs=True)
+        # Retry transient failures (connection errors, 409 lock conflicts, 5xx,
+        # and 429s Stripe marks retryable) with jittered exponential backoff.
+        # The SDK adds idempotency keys to retried POSTs, so a retried create
+        # can't create twice.
+        stripe.max_network_retries = STRIPE_MAX_NETWORK_RETRIES
@@ -168,3 +168,14 @@ class TemplatePurchase(models.Model):
             self.user.unlock_template(self.template_id)
 
         return True
+
+
+class ProcessedStripeEvent(models.Model):
+    """Stripe webhook event that has been handled; guards against re-delivery."""
+
+    event_id = models.CharField(max_length=255, primary_key=True)
+    event_type = models.CharField(max_length=100)
+    processed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.event_type} {self.event_id}"
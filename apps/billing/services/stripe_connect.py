@@ -2,23 +2,52 @@
 Stripe Connect Service for handling business payment connections.
 """
 import stripe
+import time
 from decimal import Decimal
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 from django.utils import timezone
 
+# Fixed part of every client portal checkout session (never mutated)
+CHECKOUT_SESSION_DEFAULTS = {
+    'payment_method_types': ['card'],
+    'mode': 'payment',
+}
+
+CONNECT_ACCOUNT_CACHE_TTL = 600  # seconds; account.updated webhooks drop entries early
+
+
+def connect_account_cache_key(account_id):
+    """Cache key for the retrieved fields of a Connect account."""
+    return f"stripe_acct:{account_id}"
+
+
+CHECKOUT_IDEMPOTENCY_WINDOW = 60  # seconds
+
+
+def checkout_idempotency_key(*parts):
+    """
+    Idempotency key for a checkout session, stable for CHECKOUT_IDEMPOTENCY_WINDOW.
+
+    A double-click or client retry inside the window gets the session Stripe
+    already created instead of a second one. Parts should cover everything
+    the session's parameters depend on, since Stripe rejects a reused key
+    with different parameters.
+    """
+    window = int(time.time() // CHECKOUT_IDEMPOTENCY_WINDOW)
+    return '-'.join(['checkout', *map(str, parts), str(window)])
+
 
 class StripeConnectService:
     """Service for managing Stripe Connect integrations."""
 
     def __init__(self):
-        self.stripe = stripe
-        self.stripe.api_key = (
-            settings.STRIPE_LIVE_SECRET_KEY
-            if settings.STRIPE_LIVE_MODE
-            else settings.STRIPE_TEST_SECRET_KEY
-        )
-        self.platform_fee_percent = getattr(
-            settings, 'CLIENT_PORTAL_PLATFORM_FEE_PERCENT', 0
+        # The API key and HTTP client are set once in BillingConfig.ready().
+        # The platform fee is kept in whole basis points, so fees are
+        # computed in integer cents.
+        self.platform_fee_bp = int(
+            Decimal(str(getattr(settings, 'CLIENT_PORTAL_PLATFORM_FEE_PERCENT', 0))) * 100
         )
 
     def create_connect_account(self, company):
@@ -32,7 +61,7 @@ class StripeConnectService:
             dict with 'success', 'account_id', and 'error' if failed
         """
         try:
-            account = self.stripe.Account.create(
+            account = stripe.Account.create(
                 type='standard',
                 email=company.email or company.get_effective_owner().email,
                 metadata={
@@ -75,7 +104,7 @@ class StripeConnectService:
                 return result
 
         try:
-            account_link = self.stripe.AccountLink.create(
+            account_link = stripe.AccountLink.create(
                 account=company.stripe_connect_account_id,
                 refresh_url=refresh_url,
                 return_url=return_url,
@@ -93,9 +122,12 @@ class StripeConnectService:
                 'error': str(e),
             }
 
-    def get_account_status(self, company):
+    def get_stored_account_status(self, company):
         """
-        Get the current status of a Stripe Connect account.
+        Get the Stripe Connect status mirrored on the company row.
+
+        account.updated webhooks keep these fields current, so this makes no
+        Stripe call. Use refresh_account_status() to re-read from Stripe.
 
         Args:
             company: Company model instance
@@ -111,33 +143,46 @@ class StripeConnectService:
                 'onboarding_complete': False,
             }
 
-        try:
-            account = self.stripe.Account.retrieve(
-                company.stripe_connect_account_id
-            )
+        return {
+            'connected': True,
+            'account_id': company.stripe_connect_account_id,
+            'charges_enabled': company.stripe_connect_charges_enabled,
+            'payouts_enabled': company.stripe_connect_payouts_enabled,
+            'onboarding_complete': company.stripe_connect_onboarding_complete,
+        }
 
-            # Update company fields
-            company.stripe_connect_charges_enabled = account.charges_enabled
-            company.stripe_connect_payouts_enabled = account.payouts_enabled
-            company.stripe_connect_onboarding_complete = account.details_submitted
+    def refresh_account_status(self, company):
+        """
+        Re-read a Stripe Connect account's status from Stripe and mirror it
+        onto the company row.
 
-            if account.charges_enabled and not company.stripe_connect_connected_at:
-                company.stripe_connect_connected_at = timezone.now()
+        Args:
+            company: Company model instance
 
-            company.save(update_fields=[
-                'stripe_connect_charges_enabled',
-                'stripe_connect_payouts_enabled',
-                'stripe_connect_onboarding_complete',
-                'stripe_connect_connected_at',
-            ])
+        Returns:
+            dict with account status details
+        """
+        if not company.stripe_connect_account_id:
+            return self.get_stored_account_status(company)
+
+        try:
+            account = self._retrieve_account(company.stripe_connect_account_id)
+
+            # Update company fields
+            self._mirror_account(
+                company,
+                charges_enabled=account['charges_enabled'],
+                payouts_enabled=account['payouts_enabled'],
+                details_submitted=account['details_submitted'],
+            )
 
             return {
                 'connected': True,
-                'account_id': account.id,
-                'charges_enabled': account.charges_enabled,
-                'payouts_enabled': account.payouts_enabled,
-                'onboarding_complete': account.details_submitted,
-                'email': account.email,
+                'account_id': account['id'],
+                'charges_enabled': account['charges_enabled'],
+                'payouts_enabled': account['payouts_enabled'],
+                'onboarding_complete': account['details_submitted'],
+                'email': account['email'],
             }
 
         except stripe.error.StripeError as e:
@@ -146,6 +191,47 @@ class StripeConnectService:
                 'error': str(e),
             }
 
+    @staticmethod
+    def _mirror_account(company, charges_enabled, payouts_enabled, details_submitted):
+        """Copy account state onto the company, writing only the columns that changed.
+
+        Stripe re-delivers account.updated events, and most status checks
+        find nothing new; neither should cost an UPDATE.
+        """
+        update_fields = []
+        for field, value in (
+            ('stripe_connect_charges_enabled', charges_enabled),
+            ('stripe_connect_payouts_enabled', payouts_enabled),
+            ('stripe_connect_onboarding_complete', details_submitted),
+        ):
+            if getattr(company, field) != value:
+                setattr(company, field, value)
+                update_fields.append(field)
+
+        if charges_enabled and not company.stripe_connect_connected_at:
+            company.stripe_connect_connected_at = timezone.now()
+            update_fields.append('stripe_connect_connected_at')
+
+        if update_fields:
+            company.save(update_fields=update_fields)
+
+    @staticmethod
+    def _retrieve_account(account_id):
+        """The account fields refresh_account_status uses, cached per account."""
+        key = connect_account_cache_key(account_id)
+        fields = cache.get(key)
+        if fields is None:
+            account = stripe.Account.retrieve(account_id)
+            fields = {
+                'id': account.id,
+                'charges_enabled': account.charges_enabled,
+                'payouts_enabled': account.payouts_enabled,
+                'details_submitted': account.details_submitted,
+                'email': account.email,
+            }
+            cache.set(key, fields, CONNECT_ACCOUNT_CACHE_TTL)
+        return fields
+
     def create_login_link(self, company):
         """
         Create a login link to the Stripe Express Dashboard.
@@ -163,7 +249,7 @@ class StripeConnectService:
             }
 
         try:
-            login_link = self.stripe.Account.create_login_link(
+            login_link = stripe.Account.create_login_link(
                 company.stripe_connect_account_id
             )
 
@@ -208,19 +294,19 @@ class StripeConnectService:
                 'error': 'Business Stripe account cannot accept charges',
             }
 
-        # Calculate amounts
+        # Calculate amounts (total is a 2-place Decimal, so this is exact)
         amount_cents = int(invoice.total * 100)
         currency = invoice.currency.lower()
 
-        # Calculate platform fee
-        platform_fee_cents = 0
-        if self.platform_fee_percent > 0:
-            platform_fee_cents = int(amount_cents * (self.platform_fee_percent / 100))
+        # Calculate platform fee, rounded down to the cent. Integer math: a
+        # float percent can land just under a whole cent (2.9% of $10.00
+        # came out as 28 cents).
+        platform_fee_cents = amount_cents * self.platform_fee_bp // 10000
 
         try:
             # Create checkout session with payment going to connected account
             session_params = {
-                'payment_method_types': ['card'],
+                **CHECKOUT_SESSION_DEFAULTS,
                 'line_items': [{
                     'price_data': {
                         'currency': currency,
@@ -232,7 +318,6 @@ class StripeConnectService:
                     },
                     'quantity': 1,
                 }],
-                'mode': 'payment',
                 'success_url': success_url,
                 'cancel_url': cancel_url,
                 'metadata': {
@@ -254,7 +339,12 @@ class StripeConnectService:
             if platform_fee_cents > 0:
                 session_params['payment_intent_data']['application_fee_amount'] = platform_fee_cents
 
-            checkout_session = self.stripe.checkout.Session.create(**session_params)
+            checkout_session = stripe.checkout.Session.create(
+                **session_params,
+                idempotency_key=checkout_idempotency_key(
+                    'invoice', invoice.id, client.id, amount_cents, currency
+                ),
+            )
 
             return {
                 'success': True,
@@ -336,21 +426,21 @@ class StripeConnectService:
             return {'success': False, 'error': 'No account ID in event'}
 
         try:
-            company = Company.objects.get(stripe_connect_account_id=account_id)
-
-            company.stripe_connect_charges_enabled = account_data.get('charges_enabled', False)
-            company.stripe_connect_payouts_enabled = account_data.get('payouts_enabled', False)
-            company.stripe_connect_onboarding_complete = account_data.get('details_submitted', False)
-
-            if company.stripe_connect_charges_enabled and not company.stripe_connect_connected_at:
-                company.stripe_connect_connected_at = timezone.now()
-
-            company.save(update_fields=[
+            company = Company.objects.only(
+                'id',
                 'stripe_connect_charges_enabled',
                 'stripe_connect_payouts_enabled',
                 'stripe_connect_onboarding_complete',
                 'stripe_connect_connected_at',
-            ])
+            ).get(stripe_connect_account_id=account_id)
+
+            self._mirror_account(
+                company,
+                charges_enabled=account_data.get('charges_enabled', False),
+                payouts_enabled=account_data.get('payouts_enabled', False),
+                details_submitted=account_data.get('details_submitted', False),
+            )
+            cache.delete(connect_account_cache_key(account_id))
 
             return {'success': True, 'company_id': company.id}
 
@@ -383,26 +473,39 @@ class StripeConnectService:
             return {'success': False, 'error': 'Missing invoice_id or client_id'}
 
         try:
-            invoice = Invoice.objects.get(id=invoice_id)
-            client = Client.objects.get(id=client_id)
-
-            # Create or update ClientPayment record
-            payment, created = ClientPayment.objects.get_or_create(
-                stripe_checkout_session_id=session_data['id'],
-                defaults={
-                    'client': client,
-                    'invoice': invoice,
-                    'amount': Decimal(session_data.get('amount_total', 0)) / 100,
-                    'currency': session_data.get('currency', 'usd').upper(),
-                    'stripe_payment_intent_id': session_data.get('payment_intent', ''),
-                    'platform_fee': Decimal(
-                        session_data.get('application_fee_amount', 0) or 0
-                    ) / 100,
-                }
-            )
-
-            # Complete the payment (marks invoice as paid)
-            payment.complete()
+            with transaction.atomic():
+                # Marking the invoice paid sends the receipt, which reads the
+                # company and its owner; load them in the same query.
+                invoice = Invoice.objects.select_related(
+                    'company', 'company__user'
+                ).get(id=invoice_id)
+
+                # The portal normally created a pending record when checkout
+                # started. Lock it so a re-delivered event waits for this one.
+                payment = ClientPayment.objects.select_for_update().filter(
+                    stripe_checkout_session_id=session_data['id']
+                ).first()
+                created = payment is None
+                if created:
+                    client = Client.objects.only('id').get(id=client_id)
+                    payment = ClientPayment.objects.create(
+                        stripe_checkout_session_id=session_data['id'],
+                        client=client,
+                        invoice=invoice,
+                        amount=Decimal(session_data.get('amount_total', 0)) / 100,
+                        currency=session_data.get('currency', 'usd').upper(),
+                        stripe_payment_intent_id=session_data.get('payment_intent', ''),
+                        platform_fee=Decimal(
+                            session_data.get('application_fee_amount', 0) or 0
+                        ) / 100,
+                    )
+                elif payment.invoice_id == invoice.id:
+                    payment.invoice = invoice  # Already loaded; complete() saves it
+
+                # Complete the payment (marks invoice as paid). A re-delivered
+                # event leaves the original completion time alone.
+                if payment.status != 'succeeded':
+                    payment.complete()
 
             return {
                 'success': True,
@@ -415,5 +518,7 @@ class StripeConnectService:
             return {'success': False, 'error': f'Invoice {invoice_id} not found'}
         except Client.DoesNotExist:
             return {'success': False, 'error': f'Client {client_id} not found'}
-        except Exception as e:
-            return {'success': False, 'error': str(e)}
+
+
+# Stateless apart from settings read at startup; shared by all views.
+stripe_connect_service = StripeConnectService()
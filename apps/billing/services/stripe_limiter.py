@@ -0,0 +1,72 @@
+"""
+Rate limiting and timing for outbound Stripe API calls.
+
+Stripe rejects bursts above its per-account limit (roughly 100 requests/s
+in live mode, 25 in test mode) with 429s. acquire() keeps the whole
+deployment under that by counting calls per one-second window in the
+shared cache; when a window is full the caller waits for the next one
+instead of sending a request that would be refused.
+
+StripeRequestsClient, the SDK's process-wide HTTP client, takes a slot
+before every request and logs each call's method, path, status and wall
+time, so slow Stripe endpoints show up in the logs.
+"""
+import logging
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+
+try:
+    from stripe import RequestsClient  # stripe >= 8
+except ImportError:
+    from stripe.http_client import RequestsClient
+
+logger = logging.getLogger(__name__)
+
+STRIPE_LIVE_RPS = 100
+STRIPE_TEST_RPS = 25
+STRIPE_LIMIT_MAX_WAIT = 5  # seconds; after that the call goes out anyway
+
+
+def acquire(bucket='stripe_api'):
+    """Block until the current one-second window has room for a call."""
+    limit = STRIPE_LIVE_RPS if settings.STRIPE_LIVE_MODE else STRIPE_TEST_RPS
+    deadline = time.monotonic() + STRIPE_LIMIT_MAX_WAIT
+
+    while True:
+        now = time.time()
+        window = int(now)
+        key = f"ratelimit:{bucket}:{window}"
+        cache.add(key, 0, 2)
+        try:
+            count = cache.incr(key)
+        except ValueError:  # Expired between add() and incr()
+            count = None
+
+        if (count is not None and count <= limit) or time.monotonic() >= deadline:
+            return
+        if count is not None:
+            time.sleep(window + 1 - now)
+
+
+class StripeRequestsClient(RequestsClient):
+    """Stripe HTTP client that rate-limits and times each request."""
+
+    def request(self, method, url, *args, **kwargs):
+        acquire()
+        status = None
+        started = time.perf_counter()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+            status = response[1]
+            return response
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            path = urlsplit(url).path
+            logger.info(
+                f"Stripe {method.upper()} {path} -> {status} in {ms:.0f}ms",
+                extra={'stripe_method': method.upper(), 'stripe_path': path,
+                       'stripe_status': status, 'duration_ms': round(ms, 1)},
+            )
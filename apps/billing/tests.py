@@ -0,0 +1,165 @@
+"""
+Tests for Stripe webhook handling: each event is applied exactly once.
+"""
+import threading
+import unittest
+from unittest.mock import patch
+
+from django.db import DatabaseError, connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from apps.accounts.models import CustomUser
+from apps.billing.models import ProcessedStripeEvent
+
+
+def make_user(email='sub@test.com', customer_id='cus_123'):
+    return CustomUser.objects.create_user(
+        username=email.split('@')[0],
+        email=email,
+        password='testpass123',
+        subscription_tier='professional',
+        subscription_status='active',
+        stripe_customer_id=customer_id,
+    )
+
+
+def payment_failed_event(event_id='evt_1', customer_id='cus_123'):
+    return {
+        'id': event_id,
+        'type': 'invoice.payment_failed',
+        'data': {'object': {'id': 'in_1', 'customer': customer_id}},
+    }
+
+
+def raise_database_error(obj):
+    raise DatabaseError('connection lost')
+
+
+def deliver(client):
+    return client.post(
+        reverse('billing:webhook'), data=b'{}',
+        content_type='application/json', HTTP_STRIPE_SIGNATURE='sig',
+    )
+
+
+class WebhookTestMixin:
+
+    def post_event(self, event):
+        with patch('apps.billing.views.stripe.Webhook.construct_event', return_value=event):
+            return deliver(self.client)
+
+
+class StripeWebhookTests(WebhookTestMixin, TestCase):
+
+    def setUp(self):
+        self.user = make_user()
+
+    def test_event_is_applied_and_recorded(self):
+        response = self.post_event(payment_failed_event())
+
+        self.assertEqual(response.json(), {'status': 'success'})
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.subscription_status, 'past_due')
+        self.assertTrue(ProcessedStripeEvent.objects.filter(event_id='evt_1').exists())
+
+    def test_duplicate_event_is_not_applied_again(self):
+        self.post_event(payment_failed_event())
+        CustomUser.objects.filter(pk=self.user.pk).update(subscription_status='active')
+
+        response = self.post_event(payment_failed_event())
+
+        self.assertEqual(response.json(), {'status': 'duplicate'})
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.subscription_status, 'active')
+
+    def test_event_for_missing_user_is_recorded_and_skipped(self):
+        # e.g. a deleted account whose subscription Stripe still bills
+        response = self.post_event(payment_failed_event(customer_id='cus_deleted'))
+
+        self.assertEqual(response.json(), {'status': 'success'})
+        self.assertTrue(ProcessedStripeEvent.objects.filter(event_id='evt_1').exists())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.subscription_status, 'active')
+
+    def test_subscription_event_for_deleted_user_is_recorded(self):
+        event = {
+            'id': 'evt_sub',
+            'type': 'customer.subscription.deleted',
+            'data': {'object': {'id': 'sub_1', 'customer': 'cus_123', 'metadata': {'user_id': '999999'}}},
+        }
+        response = self.post_event(event)
+
+        self.assertEqual(response.json(), {'status': 'success'})
+        self.assertTrue(ProcessedStripeEvent.objects.filter(event_id='evt_sub').exists())
+
+    def test_transient_failure_leaves_event_unrecorded_for_retry(self):
+        with patch.dict('apps.billing.views.WEBHOOK_HANDLERS',
+                        {'invoice.payment_failed': raise_database_error}):
+            response = self.post_event(payment_failed_event())
+
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(ProcessedStripeEvent.objects.filter(event_id='evt_1').exists())
+
+        # The retry is applied once the database is back
+        response = self.post_event(payment_failed_event())
+        self.assertEqual(response.json(), {'status': 'success'})
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.subscription_status, 'past_due')
+
+    def test_client_portal_payment_for_missing_invoice_is_recorded(self):
+        event = {
+            'id': 'evt_portal',
+            'type': 'checkout.session.completed',
+            'data': {'object': {
+                'id': 'cs_1',
+                'metadata': {'type': 'client_portal_payment', 'invoice_id': '999999', 'client_id': '1'},
+            }},
+        }
+        response = self.post_event(event)
+
+        self.assertEqual(response.json(), {'status': 'success'})
+        self.assertTrue(ProcessedStripeEvent.objects.filter(event_id='evt_portal').exists())
+
+    def test_unhandled_event_type_is_ignored(self):
+        response = self.post_event({'id': 'evt_x', 'type': 'charge.refunded', 'data': {'object': {}}})
+
+        self.assertEqual(response.json(), {'status': 'ignored'})
+        self.assertFalse(ProcessedStripeEvent.objects.exists())
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'needs row locking across connections')
+class ConcurrentWebhookTests(TransactionTestCase):
+
+    def test_concurrent_deliveries_apply_once(self):
+        make_user()
+        calls = []
+        first_started = threading.Event()
+        release_first = threading.Event()
+
+        def slow_handler(invoice):
+            calls.append(invoice['id'])
+            first_started.set()
+            release_first.wait(5)
+
+        responses = []
+
+        def deliver_in_thread():
+            responses.append(deliver(Client()).json())
+            connection.close()
+
+        with patch('apps.billing.views.stripe.Webhook.construct_event',
+                   return_value=payment_failed_event()), \
+                patch.dict('apps.billing.views.WEBHOOK_HANDLERS',
+                           {'invoice.payment_failed': slow_handler}):
+            first = threading.Thread(target=deliver_in_thread)
+            first.start()
+            first_started.wait(5)
+            second = threading.Thread(target=deliver_in_thread)
+            second.start()  # Waits on the first delivery's uncommitted insert
+            release_first.set()
+            first.join()
+            second.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertCountEqual(responses, [{'status': 'success'}, {'status': 'duplicate'}])
@@ -7,11 +7,19 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import TemplateView, View
 from django.contrib import messages
 from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 import stripe
+import hashlib
 import json
+import logging
+
+from .models import ProcessedStripeEvent
+from .services.stripe_connect import checkout_idempotency_key
+
+logger = logging.getLogger(__name__)
 
 
 class BillingOverviewView(LoginRequiredMixin, TemplateView):
@@ -23,11 +31,11 @@ class BillingOverviewView(LoginRequiredMixin, TemplateView):
         user = self.request.user
 
         context['current_tier'] = user.subscription_tier
-        context['tier_config'] = settings.SUBSCRIPTION_TIERS.get(user.subscription_tier, {})
+        context['tier_config'] = user.tier_config
         context['all_tiers'] = settings.SUBSCRIPTION_TIERS
         context['usage'] = {
             'invoices_created': user.invoices_created_this_month,
-            'api_calls': user.api_calls_this_month,
+            'api_calls': user.get_api_calls_this_month(),
             'usage_percentage': user.get_usage_percentage(),
         }
         context['is_subscriber'] = user.is_active_subscriber()
@@ -35,6 +43,12 @@ class BillingOverviewView(LoginRequiredMixin, TemplateView):
         return context
 
 
+def plans_version():
+    """Short digest of SUBSCRIPTION_TIERS, for keying cached plan fragments."""
+    tiers = json.dumps(settings.SUBSCRIPTION_TIERS, sort_keys=True, default=str)
+    return hashlib.blake2b(tiers.encode(), digest_size=4).hexdigest()
+
+
 class PlansView(LoginRequiredMixin, TemplateView):
     """View and compare subscription plans."""
     template_name = 'billing/plans.html'
@@ -42,10 +56,41 @@ class PlansView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['plans'] = settings.SUBSCRIPTION_TIERS
+        context['plans_version'] = plans_version()
         context['current_tier'] = self.request.user.subscription_tier
         return context
 
 
+def ensure_stripe_customer(user):
+    """
+    Return the user's Stripe customer id, creating the customer on first use.
+
+    The user row is locked while the customer is created, so a double-clicked
+    checkout can't create two customers; the idempotency key covers the same
+    race at Stripe's end.
+    """
+    from apps.accounts.models import CustomUser
+
+    if user.stripe_customer_id:
+        return user.stripe_customer_id
+
+    with transaction.atomic():
+        locked = CustomUser.objects.select_for_update().only(
+            'id', 'email', 'stripe_customer_id', 'api_key_hash'
+        ).get(pk=user.pk)
+        if not locked.stripe_customer_id:
+            customer = stripe.Customer.create(
+                email=locked.email,
+                metadata={'user_id': locked.pk},
+                idempotency_key=f'customer-create-{locked.pk}',
+            )
+            locked.stripe_customer_id = customer.id
+            locked.save(update_fields=['stripe_customer_id'])
+
+    user.stripe_customer_id = locked.stripe_customer_id
+    return user.stripe_customer_id
+
+
 @login_required
 def create_checkout_session(request, plan):
     """Create Stripe checkout session for subscription."""
@@ -62,33 +107,16 @@ def create_checkout_session(request, plan):
         messages.success(request, f'Switched to {tier["name"]} plan.')
         return redirect('accounts:dashboard')
 
-    # Initialize Stripe
-    stripe.api_key = settings.STRIPE_TEST_SECRET_KEY if not settings.STRIPE_LIVE_MODE else settings.STRIPE_LIVE_SECRET_KEY
-
-    # Stripe price IDs (set via env after creating the products in Stripe Dashboard)
-    price_ids = {
-        'professional': settings.STRIPE_PRO_PRICE_ID,  # $12/month
-        'business': settings.STRIPE_BUSINESS_PRICE_ID,  # $49/month
-    }
-
-    price_id = price_ids.get(plan)
+    # Stripe price IDs live on the tier (set via env in settings)
+    price_id = tier.get('stripe_price_id')
     if not price_id:
         messages.error(request, 'This plan is not available for purchase yet. Please try again later.')
         return redirect('billing:plans')
 
     try:
-        # Create or get Stripe customer
-        if not request.user.stripe_customer_id:
-            customer = stripe.Customer.create(
-                email=request.user.email,
-                metadata={'user_id': request.user.id}
-            )
-            request.user.stripe_customer_id = customer.id
-            request.user.save()
-
         # Create checkout session
         checkout_session = stripe.checkout.Session.create(
-            customer=request.user.stripe_customer_id,
+            customer=ensure_stripe_customer(request.user),
             payment_method_types=['card'],
             line_items=[{
                 'price': price_id,
@@ -100,7 +128,10 @@ def create_checkout_session(request, plan):
             metadata={
                 'user_id': request.user.id,
                 'plan': plan,
-            }
+            },
+            # Lets subscription webhooks find the user by primary key
+            subscription_data={'metadata': {'user_id': request.user.id}},
+            idempotency_key=checkout_idempotency_key('plan', request.user.id, plan),
         )
 
         return redirect(checkout_session.url)
@@ -117,8 +148,6 @@ def customer_portal(request):
         messages.error(request, 'No billing account found.')
         return redirect('billing:overview')
 
-    stripe.api_key = settings.STRIPE_TEST_SECRET_KEY if not settings.STRIPE_LIVE_MODE else settings.STRIPE_LIVE_SECRET_KEY
-
     try:
         session = stripe.billing_portal.Session.create(
             customer=request.user.stripe_customer_id,
@@ -147,8 +176,6 @@ def stripe_webhook(request):
     payload = request.body
     sig_header = request.META.get('HTTP_STRIPE_SIGNATURE')
 
-    stripe.api_key = settings.STRIPE_TEST_SECRET_KEY if not settings.STRIPE_LIVE_MODE else settings.STRIPE_LIVE_SECRET_KEY
-
     try:
         event = stripe.Webhook.construct_event(
             payload, sig_header, settings.DJSTRIPE_WEBHOOK_SECRET
@@ -158,31 +185,32 @@ def stripe_webhook(request):
     except stripe.error.SignatureVerificationError:
         return JsonResponse({'error': 'Invalid signature'}, status=400)
 
-    # Handle specific events
-    if event['type'] == 'checkout.session.completed':
-        session = event['data']['object']
-        handle_checkout_completed(session)
-
-    elif event['type'] == 'customer.subscription.updated':
-        subscription = event['data']['object']
-        handle_subscription_updated(subscription)
-
-    elif event['type'] == 'customer.subscription.deleted':
-        subscription = event['data']['object']
-        handle_subscription_deleted(subscription)
-
-    elif event['type'] == 'invoice.payment_succeeded':
-        invoice = event['data']['object']
-        handle_payment_succeeded(invoice)
-
-    elif event['type'] == 'invoice.payment_failed':
-        invoice = event['data']['object']
-        handle_payment_failed(invoice)
-
-    # Stripe Connect events
-    elif event['type'] == 'account.updated':
-        account = event['data']['object']
-        handle_connect_account_updated(account)
+    handler = WEBHOOK_HANDLERS.get(event['type'])
+    if handler is None:
+        # Not an event we act on; nothing to record either
+        return JsonResponse({'status': 'ignored'})
+
+    # Stripe re-delivers an event until it gets a 2xx (and the dashboard can
+    # resend it); handle each one once. The event is recorded in the same
+    # transaction as its handler. Handlers return normally for outcomes a
+    # retry can't change (e.g. the user was deleted) and only raise on
+    # transient errors, which roll back the record too and answer 500, so
+    # the retry runs it again; a concurrent duplicate waits on the insert,
+    # then bails.
+    try:
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    ProcessedStripeEvent.objects.create(
+                        event_id=event['id'], event_type=event['type']
+                    )
+            except IntegrityError:
+                return JsonResponse({'status': 'duplicate'})
+
+            handler(event['data']['object'])
+    except Exception:
+        logger.exception(f"Stripe webhook {event['id']} ({event['type']}) not applied")
+        return JsonResponse({'error': 'Event not applied'}, status=500)
 
     return JsonResponse({'status': 'success'})
 
@@ -190,7 +218,6 @@ def stripe_webhook(request):
 def handle_checkout_completed(session):
     """Handle successful checkout (subscriptions, credit purchases, template purchases, and client payments)."""
     from decimal import Decimal
-    from apps.accounts.models import CustomUser
     from .models import CreditPurchase, TemplatePurchase
     from apps.affiliates.services.commission_tracker import create_commission_for_purchase
 
@@ -198,9 +225,12 @@ def handle_checkout_completed(session):
 
     # Check if this is a client portal payment
     if metadata.get('type') == 'client_portal_payment':
-        from .services.stripe_connect import StripeConnectService
-        service = StripeConnectService()
-        service.handle_checkout_completed(session)
+        from .services.stripe_connect import stripe_connect_service as service
+        result = service.handle_checkout_completed(session)
+        if not result['success']:
+            # Missing metadata or a deleted invoice/client stays that way on
+            # retry; database errors raise out of the service instead.
+            logger.error(f"Client portal checkout {session.get('id')} not applied: {result['error']}")
         return
 
     user_id = metadata.get('user_id')
@@ -214,33 +244,33 @@ def handle_checkout_completed(session):
             purchase.complete_purchase(
                 payment_intent_id=session.get('payment_intent', '')
             )
-            # Track affiliate commission
-            try:
-                user = CustomUser.objects.get(id=user_id)
-                amount = Decimal(str(session.get('amount_total', 0))) / 100
-                is_bundle = metadata.get('is_bundle') == 'True'
-                description = 'Template Bundle' if is_bundle else f"Template: {metadata.get('template_id', 'Unknown')}"
-                create_commission_for_purchase(
-                    user=user,
-                    purchase_type='template',
-                    purchase_description=description,
-                    purchase_amount=amount,
-                    stripe_payment_intent_id=session.get('payment_intent', '')
-                )
-            except CustomUser.DoesNotExist:
-                pass
         except TemplatePurchase.DoesNotExist:
             # Fallback: unlock template directly if purchase record not found
-            try:
-                user = CustomUser.objects.get(id=user_id)
-                template_id = metadata.get('template_id')
-                is_bundle = metadata.get('is_bundle') == 'True'
-                if is_bundle:
-                    user.unlock_all_premium_templates()
-                elif template_id:
-                    user.unlock_template(template_id)
-            except (CustomUser.DoesNotExist, ValueError):
-                pass
+            user = _webhook_user({'id': user_id})
+            if user is None:
+                return
+            template_id = metadata.get('template_id')
+            is_bundle = metadata.get('is_bundle') == 'True'
+            if is_bundle:
+                user.unlock_all_premium_templates()
+            elif template_id:
+                user.unlock_template(template_id)
+            return
+
+        # Track affiliate commission
+        user = _webhook_user({'id': user_id})
+        if user is None:
+            return
+        amount = Decimal(str(session.get('amount_total', 0))) / 100
+        is_bundle = metadata.get('is_bundle') == 'True'
+        description = 'Template Bundle' if is_bundle else f"Template: {metadata.get('template_id', 'Unknown')}"
+        create_commission_for_purchase(
+            user=user,
+            purchase_type='template',
+            purchase_description=description,
+            purchase_amount=amount,
+            stripe_payment_intent_id=session.get('payment_intent', '')
+        )
         return
 
     # Check if this is a credit purchase
@@ -250,125 +280,151 @@ def handle_checkout_completed(session):
             purchase.complete_purchase(
                 payment_intent_id=session.get('payment_intent', '')
             )
-            # Track affiliate commission
-            try:
-                user = CustomUser.objects.get(id=user_id)
-                amount = Decimal(str(session.get('amount_total', 0))) / 100
-                credits = metadata.get('credits', '0')
-                create_commission_for_purchase(
-                    user=user,
-                    purchase_type='credit_pack',
-                    purchase_description=f'{credits} Credit Pack',
-                    purchase_amount=amount,
-                    stripe_payment_intent_id=session.get('payment_intent', '')
-                )
-            except CustomUser.DoesNotExist:
-                pass
         except CreditPurchase.DoesNotExist:
             # Fallback: create credits directly if purchase record not found
-            try:
-                user = CustomUser.objects.get(id=user_id)
-                credits = int(metadata.get('credits', 0))
-                if credits > 0:
-                    user.add_credits(credits)
-            except (CustomUser.DoesNotExist, ValueError):
-                pass
+            user = _webhook_user({'id': user_id})
+            if user is None:
+                return
+            credits = int(metadata.get('credits', 0))
+            if credits > 0:
+                user.add_credits(credits)
+            return
+
+        # Track affiliate commission
+        user = _webhook_user({'id': user_id})
+        if user is None:
+            return
+        amount = Decimal(str(session.get('amount_total', 0))) / 100
+        credits = metadata.get('credits', '0')
+        create_commission_for_purchase(
+            user=user,
+            purchase_type='credit_pack',
+            purchase_description=f'{credits} Credit Pack',
+            purchase_amount=amount,
+            stripe_payment_intent_id=session.get('payment_intent', '')
+        )
         return
 
     # Handle subscription checkout
     plan = metadata.get('plan')
     if user_id and plan:
-        try:
-            user = CustomUser.objects.get(id=user_id)
-            user.subscription_tier = plan
-            user.subscription_status = 'active'
-            user.save()
-            # Track affiliate commission for first subscription payment
-            amount = Decimal(str(session.get('amount_total', 0))) / 100
-            plan_names = {'starter': 'Starter', 'professional': 'Professional', 'business': 'Business'}
-            create_commission_for_purchase(
-                user=user,
-                purchase_type='subscription',
-                purchase_description=f'{plan_names.get(plan, plan.title())} Plan',
-                purchase_amount=amount,
-                stripe_payment_intent_id=session.get('payment_intent', '')
-            )
-        except CustomUser.DoesNotExist:
-            pass
+        user = _webhook_user({'id': user_id})
+        if user is None:
+            return
+        user.subscription_tier = plan
+        user.subscription_status = 'active'
+        user.save(update_fields=['subscription_tier', 'subscription_status'])
+        # Track affiliate commission for first subscription payment
+        amount = Decimal(str(session.get('amount_total', 0))) / 100
+        plan_names = {'starter': 'Starter', 'professional': 'Professional', 'business': 'Business'}
+        create_commission_for_purchase(
+            user=user,
+            purchase_type='subscription',
+            purchase_description=f'{plan_names.get(plan, plan.title())} Plan',
+            purchase_amount=amount,
+            stripe_payment_intent_id=session.get('payment_intent', '')
+        )
 
 
-def handle_subscription_updated(subscription):
-    """Handle subscription updates."""
+def _webhook_user(lookup, fields=None):
+    """
+    The user a webhook event is about, or None if there is no such user.
+
+    A missing user (typically a deleted account whose Stripe subscription is
+    still billing) won't appear on a retry, so callers skip the event and it
+    is recorded as handled instead of failing for days of re-deliveries.
+    """
     from apps.accounts.models import CustomUser
 
-    customer_id = subscription.get('customer')
+    queryset = CustomUser.objects.filter(**lookup)
+    if fields:
+        queryset = queryset.only(*fields)
+    user = queryset.first()
+    if user is None:
+        logger.warning(f"Stripe webhook for unknown user {lookup}; skipped")
+    return user
+
+
+def _subscription_user_lookup(subscription):
+    """Filter kwargs for a subscription's user: by pk when our metadata carries it."""
+    user_id = (subscription.get('metadata') or {}).get('user_id')
+    if user_id:
+        return {'pk': user_id}
+    # Subscriptions created before user_id was added to their metadata
+    return {'stripe_customer_id': subscription.get('customer')}
+
+
+def handle_subscription_updated(subscription):
+    """Handle subscription updates."""
     status = subscription.get('status')
 
-    try:
-        user = CustomUser.objects.get(stripe_customer_id=customer_id)
-        user.subscription_status = status
-        user.save()
-    except CustomUser.DoesNotExist:
-        pass
+    # save(update_fields) rather than .update() so post_save still drops the
+    # cached API-key user; api_key_hash is loaded for that handler.
+    user = _webhook_user(_subscription_user_lookup(subscription), fields=['id', 'api_key_hash'])
+    if user is None:
+        return
+    user.subscription_status = status
+    user.save(update_fields=['subscription_status'])
 
 
 def handle_subscription_deleted(subscription):
     """Handle subscription cancellation."""
-    from apps.accounts.models import CustomUser
-
-    customer_id = subscription.get('customer')
-
-    try:
-        user = CustomUser.objects.get(stripe_customer_id=customer_id)
-        user.subscription_tier = 'free'
-        user.subscription_status = 'canceled'
-        user.save()
-    except CustomUser.DoesNotExist:
-        pass
+    user = _webhook_user(_subscription_user_lookup(subscription), fields=['id', 'api_key_hash'])
+    if user is None:
+        return
+    user.subscription_tier = 'free'
+    user.subscription_status = 'canceled'
+    user.save(update_fields=['subscription_tier', 'subscription_status'])
 
 
 def handle_payment_succeeded(invoice):
     """Handle successful payment."""
-    from apps.accounts.models import CustomUser
     from .models import PaymentHistory
 
-    customer_id = invoice.get('customer')
+    # Only the user's id is needed for the FK, not the whole row
+    user = _webhook_user({'stripe_customer_id': invoice.get('customer')}, fields=['id'])
+    if user is None:
+        return
 
-    try:
-        user = CustomUser.objects.get(stripe_customer_id=customer_id)
-        PaymentHistory.objects.create(
-            user=user,
-            stripe_invoice_id=invoice.get('id'),
-            amount=invoice.get('amount_paid', 0) / 100,  # Convert from cents
-            currency=invoice.get('currency', 'usd').upper(),
-            status='succeeded',
-            description=f"Subscription payment - {invoice.get('subscription')}"
-        )
-    except CustomUser.DoesNotExist:
-        pass
+    PaymentHistory.objects.create(
+        user_id=user.pk,
+        stripe_invoice_id=invoice.get('id'),
+        amount=invoice.get('amount_paid', 0) / 100,  # Convert from cents
+        currency=invoice.get('currency', 'usd').upper(),
+        status='succeeded',
+        description=f"Subscription payment - {invoice.get('subscription')}"
+    )
 
 
 def handle_payment_failed(invoice):
     """Handle failed payment."""
-    from apps.accounts.models import CustomUser
-
-    customer_id = invoice.get('customer')
-
-    try:
-        user = CustomUser.objects.get(stripe_customer_id=customer_id)
-        user.subscription_status = 'past_due'
-        user.save()
-    except CustomUser.DoesNotExist:
-        pass
+    user = _webhook_user({'stripe_customer_id': invoice.get('customer')}, fields=['id', 'api_key_hash'])
+    if user is None:
+        return
+    user.subscription_status = 'past_due'
+    user.save(update_fields=['subscription_status'])
 
 
 def handle_connect_account_updated(account):
     """Handle Stripe Connect account updates."""
-    from .services.stripe_connect import StripeConnectService
-    service = StripeConnectService()
+    from .services.stripe_connect import stripe_connect_service as service
+    # An account no company holds any more (disconnected) has nothing to
+    # mirror, so a "not found" result is not a failure to retry.
     service.handle_account_updated(account)
 
 
+# Webhook event type -> handler, called with the event's data.object
+WEBHOOK_HANDLERS = {
+    'checkout.session.completed': handle_checkout_completed,
+    'customer.subscription.updated': handle_subscription_updated,
+    'customer.subscription.deleted': handle_subscription_deleted,
+    'invoice.payment_succeeded': handle_payment_succeeded,
+    'invoice.payment_failed': handle_payment_failed,
+    # Stripe Connect events
+    'account.updated': handle_connect_account_updated,
+}
+
+
 # Credit Purchase Views
 
 class CreditsView(LoginRequiredMixin, View):
@@ -396,12 +452,12 @@ class CreditPurchaseSuccessView(LoginRequiredMixin, TemplateView):
         context['free_credits_remaining'] = user.free_credits_remaining
         context['total_available'] = user.get_available_credits()
 
-        # Get the most recent completed purchase
+        # Get the most recent completed purchase (the page only shows its credits)
         from .models import CreditPurchase
         recent_purchase = CreditPurchase.objects.filter(
             user=user,
             status='completed'
-        ).order_by('-completed_at').first()
+        ).only('id', 'credits_amount').order_by('-completed_at').first()
 
         context['recent_purchase'] = recent_purchase
 
@@ -452,9 +508,9 @@ class StripeConnectStatusView(LoginRequiredMixin, TemplateView):
             company = None
 
         if company:
-            from .services.stripe_connect import StripeConnectService
-            service = StripeConnectService()
-            status = service.get_account_status(company)
+            from .services.stripe_connect import stripe_connect_service as service
+            # Webhooks keep the company row current; don't call Stripe per render
+            status = service.get_stored_account_status(company)
             context['connect_status'] = status
             context['company'] = company
         else:
@@ -473,8 +529,7 @@ def stripe_connect_start(request):
         messages.error(request, 'Please create a company profile first.')
         return redirect('companies:settings')
 
-    from .services.stripe_connect import StripeConnectService
-    service = StripeConnectService()
+    from .services.stripe_connect import stripe_connect_service as service
 
     return_url = request.build_absolute_uri('/billing/stripe-connect/return/')
     refresh_url = request.build_absolute_uri('/billing/stripe-connect/refresh/')
@@ -496,11 +551,10 @@ def stripe_connect_return(request):
     except:
         return redirect('billing:overview')
 
-    from .services.stripe_connect import StripeConnectService
-    service = StripeConnectService()
+    from .services.stripe_connect import stripe_connect_service as service
 
     # Refresh account status
-    status = service.get_account_status(company)
+    status = service.refresh_account_status(company)
 
     if status.get('charges_enabled'):
         messages.success(
@@ -540,8 +594,7 @@ def stripe_connect_dashboard(request):
         messages.error(request, 'Please connect your Stripe account first.')
         return redirect('billing:stripe_connect_status')
 
-    from .services.stripe_connect import StripeConnectService
-    service = StripeConnectService()
+    from .services.stripe_connect import stripe_connect_service as service
 
     result = service.create_login_link(company)
 
@@ -563,8 +616,7 @@ def stripe_connect_disconnect(request):
     except:
         return redirect('billing:overview')
 
-    from .services.stripe_connect import StripeConnectService
-    service = StripeConnectService()
+    from .services.stripe_connect import stripe_connect_service as service
 
     result = service.disconnect_account(company)
 
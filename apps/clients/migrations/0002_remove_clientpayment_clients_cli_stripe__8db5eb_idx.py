@@ -0,0 +1,17 @@
+# Generated by Django 4.2.8 on 2026-10-15 16:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='clientpayment',
+            name='clients_cli_stripe__8db5eb_idx',
+        ),
+    ]
@@ -249,7 +249,7 @@ class ClientPayment(models.Model):
         indexes = [
             models.Index(fields=['client', 'status']),
             models.Index(fields=['invoice']),
-            models.Index(fields=['stripe_checkout_session_id']),
+            # stripe_checkout_session_id is unique, which already indexes it
         ]
 
     def __str__(self):
@@ -15,7 +15,7 @@ from io import BytesIO
 from .models import Client, ClientSession, ClientPayment
 from .services.magic_link import MagicLinkService
 from apps.invoices.models import Invoice
-from apps.billing.services.stripe_connect import StripeConnectService
+from apps.billing.services.stripe_connect import stripe_connect_service
 
 
 class ClientPortalMixin:
@@ -267,8 +267,9 @@ class InitiatePaymentView(ClientPortalMixin, View):
     """Initiate Stripe checkout for invoice payment."""
 
     def post(self, request, pk):
+        # The company is read here and again when building the checkout session
         invoice = get_object_or_404(
-            Invoice,
+            Invoice.objects.select_related('company'),
             pk=pk,
             client_email__iexact=self.client.email
         )
@@ -284,7 +285,6 @@ class InitiatePaymentView(ClientPortalMixin, View):
             return redirect('clients:invoice_detail', pk=pk)
 
         # Create Stripe checkout session
-        service = StripeConnectService()
         success_url = request.build_absolute_uri(
             f'/portal/invoices/{pk}/payment-success/'
         )
@@ -292,7 +292,7 @@ class InitiatePaymentView(ClientPortalMixin, View):
             f'/portal/invoices/{pk}/'
         )
 
-        result = service.create_checkout_session(
+        result = stripe_connect_service.create_checkout_session(
             invoice=invoice,
             client=self.client,
             success_url=success_url,
@@ -303,15 +303,18 @@ class InitiatePaymentView(ClientPortalMixin, View):
             messages.error(request, result.get('error', 'Unable to initiate payment.'))
             return redirect('clients:invoice_detail', pk=pk)
 
-        # Create pending payment record
-        ClientPayment.objects.create(
-            client=self.client,
-            invoice=invoice,
+        # Create pending payment record. A repeated click can get back the
+        # session Stripe already created, so the row may exist.
+        ClientPayment.objects.get_or_create(
             stripe_checkout_session_id=result['session_id'],
-            amount=invoice.total,
-            currency=invoice.currency,
-            platform_fee=result.get('platform_fee', 0),
-            status='pending',
+            defaults={
+                'client': self.client,
+                'invoice': invoice,
+                'amount': invoice.total,
+                'currency': invoice.currency,
+                'platform_fee': result.get('platform_fee', 0),
+                'status': 'pending',
+            },
         )
 
         return redirect(result['checkout_url'])
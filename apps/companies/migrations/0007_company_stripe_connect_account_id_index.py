@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-15 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0006_add_late_fee_settings'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='company',
+            name='stripe_connect_account_id',
+            field=models.CharField(blank=True, db_index=True, help_text='Stripe Connect account ID for receiving payments', max_length=255, null=True),
+        ),
+    ]
@@ -129,6 +129,7 @@ class Company(models.Model):
         max_length=255,
         blank=True,
         null=True,
+        db_index=True,  # Webhooks look companies up by account
         help_text='Stripe Connect account ID for receiving payments'
     )
     stripe_connect_onboarding_complete = models.BooleanField(
@@ -186,8 +187,10 @@ class Company(models.Model):
         return number
 
     def save(self, *args, **kwargs):
-        # Delete old logo/signature when updating with new ones
-        if self.pk:
+        # Delete old logo/signature when updating with new ones (skipped for
+        # partial saves that don't touch either)
+        update_fields = kwargs.get('update_fields')
+        if self.pk and (update_fields is None or {'logo', 'signature'} & set(update_fields)):
             try:
                 old_company = Company.objects.get(pk=self.pk)
                 if old_company.logo and old_company.logo != self.logo:
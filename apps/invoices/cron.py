@@ -444,6 +444,32 @@ def run_nurture_emails():
     return summary
 
 
+def run_affiliate_stats():
+    """Recompute affiliate stats still marked stale, e.g. whose timer died with a deploy."""
+    from apps.affiliates.models import Affiliate
+    from apps.affiliates.services.stats import STATS_DEBOUNCE_SECONDS, recompute_affiliate_stats
+
+    # Leave very recent marks to the in-process timers that are still pending
+    cutoff = timezone.now() - timedelta(seconds=STATS_DEBOUNCE_SECONDS * 2)
+    affiliate_ids = list(Affiliate.objects.filter(
+        stats_dirty_at__lte=cutoff
+    ).values_list('id', flat=True))
+
+    recomputed = 0
+    failed = 0
+    for affiliate_id in affiliate_ids:
+        try:
+            recompute_affiliate_stats(affiliate_id)
+            recomputed += 1
+        except Exception as e:
+            failed += 1
+            logger.error(f"Failed to recompute stats for affiliate {affiliate_id}: {e}", exc_info=True)
+
+    summary = {'recomputed': recomputed, 'failed': failed}
+    logger.info(f"Affiliate stats complete: {summary}")
+    return summary
+
+
 def run_all():
     """Run every daily task in order, catching top-level failures per task."""
     results = {}
@@ -452,6 +478,7 @@ def run_all():
         ('payment_reminders', run_payment_reminders),
         ('late_fees', run_late_fees),
         ('nurture_emails', run_nurture_emails),
+        ('affiliate_stats', run_affiliate_stats),
     ):
         try:
             results[name] = fn()
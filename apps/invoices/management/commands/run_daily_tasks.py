@@ -20,11 +20,12 @@ TASKS = {
     'reminders': cron.run_payment_reminders,
     'late_fees': cron.run_late_fees,
     'nurture': cron.run_nurture_emails,
+    'affiliate_stats': cron.run_affiliate_stats,
 }
 
 
 class Command(BaseCommand):
-    help = "Run daily scheduled tasks (recurring invoices, reminders, late fees, nurture emails)."
+    help = "Run daily scheduled tasks (recurring invoices, reminders, late fees, nurture emails, affiliate stats)."
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-15 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0009_trylead'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='pdf_cache_key',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+    ]
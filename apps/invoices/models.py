@@ -8,6 +8,8 @@ from django.conf import settings
 from django.utils import timezone
 from dateutil.relativedelta import relativedelta
 
+CENTS = Decimal('0.01')  # Quantum for money amounts
+
 
 class Invoice(models.Model):
     """Main invoice model."""
@@ -76,6 +78,8 @@ class Invoice(models.Model):
         blank=True,
         null=True
     )
+    # Fingerprint of the inputs pdf_file was rendered from (see InvoicePDFGenerator)
+    pdf_cache_key = models.CharField(max_length=32, blank=True, editable=False)
 
     # Public access token for QR code links
     public_token = models.UUIDField(
@@ -171,12 +175,36 @@ class Invoice(models.Model):
         days = terms_days.get(self.payment_terms, 30)
         return self.invoice_date + relativedelta(days=days)
 
-    def calculate_totals(self):
-        """Calculate subtotal, tax, and total."""
-        self.subtotal = sum(item.amount for item in self.line_items.all())
-        self.tax_amount = (self.subtotal * self.tax_rate / 100).quantize(Decimal('0.01'))
+    def calculate_totals(self, line_items=None):
+        """Calculate subtotal, tax, and total.
+
+        Pass ``line_items`` when they are already in memory (e.g. just
+        bulk-created) to skip querying them.
+        """
+        if line_items is None:
+            line_items = self.line_items.all()
+        self.subtotal = sum(item.amount for item in line_items)
+        self.tax_amount = (self.subtotal * self.tax_rate / 100).quantize(CENTS)
         self.total = self.subtotal + self.tax_amount - self.discount_amount
 
+    def save_totals(self):
+        """Write due date and already-calculated totals in one UPDATE.
+
+        Unlike save(), this does not re-query line items to recalculate.
+        The UPDATE sends no post_save, so the dashboard cache is dropped here.
+        """
+        from .signals import drop_dashboard_cache_on_commit
+
+        self.updated_at = timezone.now()
+        Invoice.objects.filter(pk=self.pk).update(
+            due_date=self.due_date,
+            subtotal=self.subtotal,
+            tax_amount=self.tax_amount,
+            total=self.total,
+            updated_at=self.updated_at,
+        )
+        drop_dashboard_cache_on_commit(self.company_id)
+
     def recalculate_and_save(self):
         """Recalculate totals and save."""
         self.calculate_totals()
@@ -248,7 +276,7 @@ class Invoice(models.Model):
             self.original_total = self.total
 
         # Apply the late fee
-        self.late_fee_applied = Decimal(str(fee_amount)).quantize(Decimal('0.01'))
+        self.late_fee_applied = Decimal(str(fee_amount)).quantize(CENTS)
         self.total = self.original_total + self.late_fee_applied
         self.late_fee_applied_at = timezone.now()
 
@@ -310,6 +338,19 @@ class Invoice(models.Model):
         return True
 
 
+class LineItemManager(models.Manager):
+    def bulk_create(self, objs, *args, **kwargs):
+        """bulk_create() skips save(); fill in amounts the same way save() does.
+
+        Unlike save(), this does not update the invoice totals; callers
+        recalculate them once after the insert.
+        """
+        objs = list(objs)
+        for item in objs:
+            item.calculate_amount()
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class LineItem(models.Model):
     """Invoice line item."""
 
@@ -324,6 +365,8 @@ class LineItem(models.Model):
     amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     order = models.PositiveIntegerField(default=0)
 
+    objects = LineItemManager()
+
     class Meta:
         ordering = ['order', 'id']
 
@@ -331,8 +374,7 @@ class LineItem(models.Model):
         return f"{self.description} ({self.quantity} x {self.rate})"
 
     def save(self, *args, **kwargs):
-        # Calculate amount
-        self.amount = (self.quantity * self.rate).quantize(Decimal('0.01'))
+        self.calculate_amount()
         super().save(*args, **kwargs)
 
         # Update invoice totals
@@ -344,6 +386,10 @@ class LineItem(models.Model):
         # Update invoice totals after deletion
         invoice.recalculate_and_save()
 
+    def calculate_amount(self):
+        """Calculate amount (quantity x rate, rounded to cents)."""
+        self.amount = (self.quantity * self.rate).quantize(CENTS)
+
 
 class InvoiceBatch(models.Model):
     """Batch invoice processing record."""
@@ -611,7 +657,7 @@ class RecurringLineItem(models.Model):
     @property
     def amount(self):
         """Calculate line item amount."""
-        return (self.quantity * self.rate).quantize(Decimal('0.01'))
+        return (self.quantity * self.rate).quantize(CENTS)
 
 
 class PaymentReminderSettings(models.Model):
@@ -918,7 +964,7 @@ class TimeEntry(models.Model):
         if not self.billable:
             return Decimal('0.00')
         hours = self.duration_hours
-        return (hours * self.hourly_rate).quantize(Decimal('0.01'))
+        return (hours * self.hourly_rate).quantize(CENTS)
 
     def can_edit(self):
         """Check if entry can be edited (only unbilled entries)."""
@@ -1000,7 +1046,7 @@ class ActiveTimer(models.Model):
     def estimated_amount(self):
         """Calculate estimated billable amount so far."""
         hours = Decimal(str(self.elapsed_seconds)) / Decimal('3600')
-        return (hours * self.hourly_rate).quantize(Decimal('0.01'))
+        return (hours * self.hourly_rate).quantize(CENTS)
 
     def stop(self):
         """Stop the timer and create a TimeEntry.
@@ -155,20 +155,23 @@ class BatchInvoiceProcessor:
             template_style=self.company.default_template,
         )
 
-        # Create line items
-        for idx, item_data in enumerate(client_data['line_items']):
-            LineItem.objects.create(
+        # Create line items in one INSERT; LineItem.save() would recalculate
+        # the invoice after every row.
+        line_items = LineItem.objects.bulk_create([
+            LineItem(
                 invoice=invoice,
                 description=item_data['description'],
                 quantity=item_data['quantity'],
                 rate=item_data['rate'],
                 order=idx
             )
+            for idx, item_data in enumerate(client_data['line_items'])
+        ])
 
-        # Recalculate totals and set due date
+        # Totals from the items already in memory, and set due date
         invoice.due_date = invoice.calculate_due_date()
-        invoice.calculate_totals()
-        invoice.save()
+        invoice.calculate_totals(line_items)
+        invoice.save_totals()
 
         return invoice
 
@@ -3,10 +3,12 @@ PDF generation service using xhtml2pdf.
 """
 import io
 import base64
+import hashlib
+import tempfile
 from io import BytesIO
 from django.template.loader import render_to_string
 from django.conf import settings
-from django.core.files.base import ContentFile
+from django.core.files.base import ContentFile, File
 from xhtml2pdf import pisa
 
 try:
@@ -16,6 +18,10 @@ except ImportError:
     HAS_QRCODE = False
 
 
+# Rendered PDFs up to this size stay in memory; larger ones spill to a temp file
+PDF_SPOOL_MAX_SIZE = 256 * 1024
+
+
 class InvoicePDFGenerator:
     """Generate PDF invoices using xhtml2pdf with HTML templates."""
 
@@ -123,8 +129,12 @@ class InvoicePDFGenerator:
             'qr_code_image': self.generate_qr_code(),
         }
 
-    def generate(self):
-        """Generate PDF and return as bytes."""
+    def generate(self, dest=None):
+        """Generate PDF and return as bytes.
+
+        If a writable file-like ``dest`` is given, the PDF is written into it
+        instead (no intermediate bytes copy) and ``dest`` is returned.
+        """
         template_name = f'invoices/pdf/{self.invoice.template_style}.html'
 
         # Fallback to clean_slate if template doesn't exist
@@ -137,14 +147,90 @@ class InvoicePDFGenerator:
             )
 
         # Generate PDF using xhtml2pdf
-        result = BytesIO()
+        result = dest if dest is not None else BytesIO()
         pdf = pisa.CreatePDF(BytesIO(html_content.encode('utf-8')), dest=result)
 
         if pdf.err:
             raise RuntimeError(f"PDF generation failed: {pdf.err}")
 
+        if dest is not None:
+            return dest
         return result.getvalue()
 
+    def generate_file(self):
+        """Generate the PDF into a rewound temporary file, spilling to disk past PDF_SPOOL_MAX_SIZE."""
+        tmp = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_SIZE)
+        try:
+            self.generate(dest=tmp)
+        except Exception:
+            tmp.close()
+            raise
+        tmp.seek(0)
+        return tmp
+
+    def get_cache_key(self):
+        """Fingerprint of everything the rendered PDF depends on.
+
+        Line item edits re-save the invoice, so invoice.updated_at covers
+        them; company.updated_at covers logo, address and colour changes.
+        """
+        parts = (
+            self.invoice.pk,
+            self.invoice.updated_at.timestamp(),
+            self.invoice.template_style,
+            self.company.pk,
+            self.company.updated_at.timestamp(),
+            self.company.user.shows_watermark(),
+        )
+        return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+    def get_or_generate_file(self, persist=True):
+        """Return an open file with the invoice PDF, rendering it only if the stored copy is stale.
+
+        With persist, a fresh render is stored in invoice.pdf_file with its
+        cache key; without it (anonymous requests) the render is only served,
+        so a public GET never writes to storage or the database.
+
+        The stored file is named after the cache key and swapped in with a
+        conditional update() (which also leaves updated_at, part of the key,
+        alone). Concurrent renders each write their own file; only the one
+        that wins the swap removes the file it replaced, and a loser removes
+        its own.
+        """
+        from django.db.models import Q
+        from apps.invoices.models import Invoice
+
+        invoice = self.invoice
+        key = self.get_cache_key()
+        if invoice.pdf_file and invoice.pdf_cache_key == key:
+            try:
+                return invoice.pdf_file.storage.open(invoice.pdf_file.name, 'rb')
+            except OSError:
+                pass  # Stored file is gone; render it again
+
+        tmp = self.generate_file()
+        if not persist:
+            return tmp
+
+        old_name = invoice.pdf_file.name or ''
+        unchanged = Q(pdf_file=old_name) if old_name else Q(pdf_file='') | Q(pdf_file__isnull=True)
+        invoice.pdf_file.save(f"{invoice.invoice_number}-{key[:12]}.pdf", File(tmp), save=False)
+        swapped = Invoice.objects.filter(unchanged, pk=invoice.pk).update(
+            pdf_file=invoice.pdf_file.name,
+            pdf_cache_key=key,
+        )
+        storage = invoice.pdf_file.storage
+        if swapped:
+            invoice.pdf_cache_key = key
+            if old_name and old_name != invoice.pdf_file.name:
+                storage.delete(old_name)
+        else:
+            # Another request stored its render first; keep theirs
+            storage.delete(invoice.pdf_file.name)
+            invoice.pdf_file.name = old_name
+        tmp.seek(0)
+        return tmp
+
     def save_to_invoice(self):
         """Generate PDF and save to invoice model."""
         pdf_bytes = self.generate()
@@ -2,7 +2,12 @@
 Invoice signals for automated email notifications.
 """
 import logging
-from django.db.models.signals import post_save
+import threading
+from functools import partial
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from allauth.account.signals import user_signed_up
@@ -23,29 +28,60 @@ def send_payment_receipt_on_paid(sender, instance, **kwargs):
     """
     # Check if status changed to 'paid'
     if instance.status == 'paid' and instance._original_status != 'paid':
-        try:
-            service = InvoiceEmailService(instance)
-            result = service.send_payment_receipt()
-
-            if result['success']:
-                logger.info(
-                    f"Payment receipt sent for invoice {instance.invoice_number} "
-                    f"to {result.get('recipients', [])}"
-                )
-            else:
-                logger.error(
-                    f"Failed to send payment receipt for invoice {instance.invoice_number}: "
-                    f"{result.get('error', 'Unknown error')}"
-                )
-        except Exception as e:
-            logger.error(
-                f"Exception sending payment receipt for invoice {instance.invoice_number}: {e}"
-            )
+        # The SMTP round-trip happens off the request (and off Stripe's
+        # webhook timeout), once the paid status is committed.
+        transaction.on_commit(partial(
+            threading.Thread(
+                target=_send_payment_receipt, args=(instance,), daemon=True
+            ).start
+        ))
 
         # Update the original status after processing
         instance._original_status = instance.status
 
 
+def _send_payment_receipt(invoice):
+    try:
+        service = InvoiceEmailService(invoice)
+        result = service.send_payment_receipt()
+
+        if result['success']:
+            logger.info(
+                f"Payment receipt sent for invoice {invoice.invoice_number} "
+                f"to {result.get('recipients', [])}"
+            )
+        else:
+            logger.error(
+                f"Failed to send payment receipt for invoice {invoice.invoice_number}: "
+                f"{result.get('error', 'Unknown error')}"
+            )
+    except Exception as e:
+        logger.error(
+            f"Exception sending payment receipt for invoice {invoice.invoice_number}: {e}"
+        )
+    finally:
+        connection.close()  # Rendering may have queried on this thread
+
+
+@receiver(post_save, sender=Invoice)
+@receiver(post_delete, sender=Invoice)
+def invalidate_dashboard_cache(sender, instance, **kwargs):
+    """Drop the company's cached dashboard stats whenever one of its invoices changes."""
+    drop_dashboard_cache_on_commit(instance.company_id)
+
+
+def drop_dashboard_cache_on_commit(company_id):
+    """
+    Drop a company's cached dashboard stats once the current transaction commits.
+
+    Deleting inside the writer's transaction would let a dashboard request
+    that lands before the commit re-cache the old stats for the full TTL.
+    """
+    from apps.accounts.views import dashboard_cache_key
+
+    transaction.on_commit(lambda: cache.delete(dashboard_cache_key(company_id)))
+
+
 @receiver(user_signed_up)
 def redeem_try_draft_on_signup(sender, request, user, **kwargs):
     """
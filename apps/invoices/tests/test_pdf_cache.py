@@ -0,0 +1,89 @@
+"""
+Tests for stored invoice PDFs: reuse, replacement, and the anonymous link.
+"""
+import shutil
+import tempfile
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.accounts.models import CustomUser
+from apps.companies.models import Company
+from apps.invoices.models import Invoice, LineItem
+from apps.invoices.services.pdf_generator import InvoicePDFGenerator
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class StoredPDFTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        user = CustomUser.objects.create_user(
+            username='owner', email='owner@test.com', password='testpass123',
+        )
+        company = Company.objects.create(user=user, owner=user, name='Test Co')
+        self.invoice = Invoice.objects.create(
+            company=company,
+            invoice_number='INV-00001',
+            client_name='Test Client',
+            invoice_date=timezone.now().date(),
+            due_date=timezone.now().date(),
+        )
+        LineItem.objects.create(
+            invoice=self.invoice, description='Work', quantity=Decimal('1'), rate=Decimal('100'),
+        )
+
+    def render(self, **kwargs):
+        pdf = InvoicePDFGenerator(self.invoice).get_or_generate_file(**kwargs)
+        pdf.close()
+        self.invoice.refresh_from_db()
+
+    def test_render_is_stored_under_its_cache_key(self):
+        self.render()
+
+        key = self.invoice.pdf_cache_key
+        self.assertTrue(key)
+        self.assertIn(key[:12], self.invoice.pdf_file.name)
+        self.assertTrue(self.invoice.pdf_file.storage.exists(self.invoice.pdf_file.name))
+
+    def test_stale_copy_is_replaced_and_removed(self):
+        self.render()
+        old_name = self.invoice.pdf_file.name
+        Invoice.objects.filter(pk=self.invoice.pk).update(updated_at=timezone.now())
+        self.invoice.refresh_from_db()
+
+        self.render()
+
+        self.assertNotEqual(self.invoice.pdf_file.name, old_name)
+        self.assertFalse(self.invoice.pdf_file.storage.exists(old_name))
+
+    def test_lost_swap_keeps_the_other_render(self):
+        stale = Invoice.objects.get(pk=self.invoice.pk)
+        self.render()  # Another request stores first
+        winner = self.invoice.pdf_file.name
+
+        pdf = InvoicePDFGenerator(stale).get_or_generate_file()
+        pdf.close()
+
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.pdf_file.name, winner)
+        self.assertTrue(self.invoice.pdf_file.storage.exists(winner))
+
+    def test_public_link_does_not_store_anything(self):
+        response = self.client.get(
+            reverse('invoices:public_invoice_pdf', args=[self.invoice.public_token])
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.invoice.refresh_from_db()
+        self.assertFalse(self.invoice.pdf_file)
+        self.assertEqual(self.invoice.pdf_cache_key, '')
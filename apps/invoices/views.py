@@ -865,14 +865,17 @@ def generate_pdf(request, pk):
 
     try:
         generator = InvoicePDFGenerator(invoice)
-        pdf_bytes = generator.generate()
+        pdf_file = generator.get_or_generate_file()
     except RuntimeError as e:
         messages.error(request, str(e))
         return redirect('invoices:detail', pk=pk)
 
-    response = HttpResponse(pdf_bytes, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{invoice.invoice_number}.pdf"'
-    return response
+    return FileResponse(
+        pdf_file,
+        content_type='application/pdf',
+        as_attachment=True,
+        filename=f'{invoice.invoice_number}.pdf',
+    )
 
 
 @login_required
@@ -1570,13 +1573,17 @@ def public_invoice_pdf(request, token):
 
     try:
         generator = InvoicePDFGenerator(invoice)
-        pdf_bytes = generator.generate()
+        # Anonymous link: a stale copy is re-rendered for this response only
+        pdf_file = generator.get_or_generate_file(persist=False)
     except RuntimeError as e:
         return HttpResponse(f'Error generating PDF: {str(e)}', status=500)
 
-    response = HttpResponse(pdf_bytes, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{invoice.invoice_number}.pdf"'
-    return response
+    return FileResponse(
+        pdf_file,
+        content_type='application/pdf',
+        as_attachment=True,
+        filename=f'{invoice.invoice_number}.pdf',
+    )
 
 
 @login_required
@@ -100,9 +100,47 @@ DATABASES = {
     }
 }
 
+# Cache
+# Shared Redis cache when REDIS_URL is set (e.g. redis://... or unix:///path/redis.sock);
+# per-process memory cache otherwise.
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Sessions are read from Redis and written through to the database, so an
+# authenticated pageview no longer SELECTs django_session. Without Redis the
+# per-process cache can't be shared between workers, so keep the DB backend.
+if REDIS_URL:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Count API calls in the shared cache and write them back in batches. Needs a
+# cache shared by every worker, so only with Redis.
+API_USAGE_BUFFERED = bool(REDIS_URL)
+
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
+# Password hashing
+# Argon2id for new hashes; PBKDF2 hashes are still verified and upgraded on next login.
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -257,6 +295,7 @@ SUBSCRIPTION_TIERS = {
     'professional': {
         'name': 'Pro',
         'price': 12,
+        'stripe_price_id': STRIPE_PRO_PRICE_ID,
         'invoices_per_month': -1,  # Unlimited
         'templates': 'all',
         'batch_upload': True,
@@ -274,6 +313,7 @@ SUBSCRIPTION_TIERS = {
     'business': {
         'name': 'Business',
         'price': 49,
+        'stripe_price_id': STRIPE_BUSINESS_PRICE_ID,
         'invoices_per_month': -1,  # Unlimited
         'templates': 'all',
         'batch_upload': True,